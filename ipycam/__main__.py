@@ -229,6 +229,9 @@ Examples:
         print("Upload a video file via the web UI to start streaming\n")
         camera.set_video_upload_mode(True)
         
+        # The "upload a video" placeholder is rendered once per resolution
+        # and copied per frame (stream() draws the timestamp in place).
+        placeholder = None
         try:
             # Main loop that handles video switching
             while camera.is_running:
@@ -263,22 +266,23 @@ Examples:
                     cap.release()
                     logger.info(f"Video source closed: {video_path}")
                 else:
-                    # No video yet, generate a placeholder frame
-                    import numpy as np
-                    placeholder = np.zeros((config.main_height, config.main_width, 3), dtype=np.uint8)
-                    # Dark blue background
-                    placeholder[:] = (30, 20, 10)
-                    # Add text
-                    text = "Upload a video to start"
-                    font = cv2.FONT_HERSHEY_SIMPLEX
-                    font_scale = 1.5
-                    thickness = 2
-                    (text_w, text_h), _ = cv2.getTextSize(text, font, font_scale, thickness)
-                    x = (config.main_width - text_w) // 2
-                    y = (config.main_height + text_h) // 2
-                    cv2.putText(placeholder, text, (x, y), font, font_scale, (100, 100, 100), thickness)
-                    
-                    camera.stream(placeholder)
+                    # No video yet, stream a placeholder frame
+                    if placeholder is None or placeholder.shape[:2] != (config.main_height, config.main_width):
+                        import numpy as np
+                        # Dark blue background
+                        placeholder = np.full((config.main_height, config.main_width, 3),
+                                              (30, 20, 10), dtype=np.uint8)
+                        # Add text
+                        text = "Upload a video to start"
+                        font = cv2.FONT_HERSHEY_SIMPLEX
+                        font_scale = 1.5
+                        thickness = 2
+                        (text_w, text_h), _ = cv2.getTextSize(text, font, font_scale, thickness)
+                        x = (config.main_width - text_w) // 2
+                        y = (config.main_height + text_h) // 2
+                        cv2.putText(placeholder, text, (x, y), font, font_scale, (100, 100, 100), thickness)
+
+                    camera.stream(placeholder.copy())
                     import time
                     time.sleep(1.0 / config.main_fps)
                     
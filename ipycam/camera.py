@@ -24,6 +24,7 @@ Usage:
 
 import logging
 import os
+import sys
 import time
 import threading
 import socketserver
@@ -48,6 +49,27 @@ from .recorder import VideoRecorder
 
 logger = logging.getLogger(__name__)
 
+# Frame pacing sleeps until this long before a frame's deadline and yields
+# for the rest: an OS sleep can overshoot by a whole scheduler tick.
+_PACE_SPIN_NS = 1_000_000
+
+
+def _set_windows_timer_resolution(enable: bool) -> bool:
+    """Raise (or restore) the Windows timer resolution to 1 ms.
+
+    The default ~15.6 ms tick makes time.sleep overshoot by most of a 60 fps
+    frame. No-op elsewhere; returns True if the period was changed.
+    """
+    if sys.platform != "win32":
+        return False
+    try:
+        import ctypes
+        winmm = ctypes.WinDLL("winmm")
+        (winmm.timeBeginPeriod if enable else winmm.timeEndPeriod)(1)
+        return True
+    except Exception:
+        return False
+
 
 class ReusableThreadingTCPServer(socketserver.ThreadingTCPServer):
     allow_reuse_address = True
@@ -75,7 +97,9 @@ class IPCamera:
         self.ptz = PTZController(
             output_width=self.config.main_width,
             output_height=self.config.main_height,
-            max_zoom=4.0
+            max_zoom=4.0,
+            use_opencl=self.config.ptz_use_opencl,
+            subpixel=self.config.ptz_subpixel,
         )
         
         # Initialize ONVIF service with PTZ
@@ -106,8 +130,9 @@ class IPCamera:
         
         # Frame pacing
         self._frame_count = 0
-        self._stream_start_time: Optional[float] = None
+        self._stream_start_time: Optional[int] = None  # time.monotonic_ns()
         self._last_fps = 0
+        self._timer_resolution_raised = False
         
         # Video upload mode
         self._video_upload_mode = False
@@ -142,6 +167,7 @@ class IPCamera:
             quality=80,
             sub_width=self.config.sub_width,
             sub_height=self.config.sub_height,
+            use_turbojpeg=self.config.mjpeg_use_turbojpeg,
         )
         self.mjpeg_streamer.start()
         mjpeg_url = f"http://{self.config.local_ip}:{self.config.onvif_port}/{self.config.mjpeg_url}"
@@ -199,6 +225,7 @@ class IPCamera:
             logger.info("  Recording: enabled (pre-record %ss, path %s)",
                         self.config.recording_pre_seconds, self.config.recording_path)
 
+        self._timer_resolution_raised = self._timer_resolution_raised or _set_windows_timer_resolution(True)
         self._running = True
         return True
     
@@ -319,6 +346,10 @@ class IPCamera:
             self._http_server.shutdown()
             self._http_server.server_close()
         
+        if self._timer_resolution_raised:
+            _set_windows_timer_resolution(False)
+            self._timer_resolution_raised = False
+
         logger.info("IP Camera stopped")
     
     def stream(self, frame: np.ndarray) -> bool:
@@ -469,19 +500,23 @@ class IPCamera:
         """Handle frame pacing to maintain target FPS"""
         # Initialize or reset timing if FPS changed
         if self._stream_start_time is None or self._last_fps != self.config.main_fps:
-            self._stream_start_time = time.time()
+            self._stream_start_time = time.monotonic_ns()
             self._frame_count = 0
             self._last_fps = self.config.main_fps
         
         self._frame_count += 1
         
-        # Calculate expected time for this frame and sleep if ahead
-        target_frame_time = 1.0 / self.config.main_fps
-        expected_time = self._stream_start_time + (self._frame_count * target_frame_time)
-        sleep_time = expected_time - time.time()
-        
-        if sleep_time > 0:
-            time.sleep(sleep_time)
+        # Deadline for this frame in integer nanoseconds: monotonic, so wall
+        # clock adjustments can't stall or burst the stream, and no float
+        # drift accumulates over long runs.
+        deadline = self._stream_start_time + self._frame_count * 1_000_000_000 // self.config.main_fps
+        remaining = deadline - time.monotonic_ns()
+        if remaining > _PACE_SPIN_NS:
+            time.sleep((remaining - _PACE_SPIN_NS) / 1e9)
+        # Finish the last stretch yielding the GIL (sleep(0)) rather than
+        # spinning on it, so the writer/encoder threads keep running.
+        while time.monotonic_ns() < deadline:
+            time.sleep(0)
     
     def _apply_display_transforms(self, frame: np.ndarray) -> np.ndarray:
         """Apply the configured rotation/flip/mirror display transforms.
@@ -156,10 +156,15 @@ class CameraConfig:
     #mjpeg fallback
     mjpeg_url: str = "stream.mjpeg"
     snapshot_url: str = "snapshot.jpg"
+    mjpeg_use_turbojpeg: bool = False  # encode with PyTurboJPEG when installed
     
     # Encoding
     hw_accel: str = "auto"
     
+    # Digital PTZ
+    ptz_use_opencl: bool = False  # resample the PTZ crop via OpenCV's OpenCL path
+    ptz_subpixel: bool = False    # sub-pixel crop placement (smoother, slower)
+
     # Overlay
     show_timestamp: bool = True
     timestamp_format: str = "%Y-%m-%d %H:%M:%S"
@@ -192,6 +197,10 @@ class CameraConfig:
         # Set as a plain instance attribute (NOT a dataclass field) so it is
         # never serialized by asdict() into the saved JSON or /api/config.
         self._config_path = DEFAULT_CONFIG_PATH
+        # Memoized ONVIF service URLs, keyed on the fields they are built from
+        # (see _onvif_urls). Plain attributes for the same reason as above.
+        self._onvif_urls_key = None
+        self._onvif_urls_cache = {}
 
     @property
     def auth_enabled(self) -> bool:
@@ -266,9 +275,47 @@ class CameraConfig:
     def sub_stream_rtsp(self) -> str:
         return f"rtsp://{self.local_ip}:{self.rtsp_port}/{self.sub_stream_name}"
     
+    def _onvif_urls(self) -> dict:
+        """Return the HTTP service URLs advertised over ONVIF.
+
+        These are requested on every GetCapabilities/GetServices call, so the
+        strings are built once and reused until local_ip, onvif_port or
+        snapshot_url change (they are plain mutable fields, so we can't just
+        compute them in __post_init__).
+        """
+        key = (self.local_ip, self.onvif_port, self.snapshot_url)
+        if self._onvif_urls_key != key:
+            base = f"http://{self.local_ip}:{self.onvif_port}"
+            self._onvif_urls_cache = {
+                'device': f"{base}/onvif/device_service",
+                'media': f"{base}/onvif/media_service",
+                'ptz': f"{base}/onvif/ptz_service",
+                'snapshot': f"{base}/{self.snapshot_url}",
+            }
+            self._onvif_urls_key = key
+        return self._onvif_urls_cache
+
     @property
     def onvif_url(self) -> str:
-        return f"http://{self.local_ip}:{self.onvif_port}/onvif/device_service"
+        return self._onvif_urls()['device']
+
+    @property
+    def device_url(self) -> str:
+        return self._onvif_urls()['device']
+
+    @property
+    def media_url(self) -> str:
+        return self._onvif_urls()['media']
+
+    @property
+    def ptz_url(self) -> str:
+        return self._onvif_urls()['ptz']
+
+    @property
+    def snapshot_uri(self) -> str:
+        # The snapshot is served by the main HTTP server on onvif_port
+        # (snapshot_url is just the path component).
+        return self._onvif_urls()['snapshot']
     
     @property
     def webrtc_url(self) -> str:
@@ -13,12 +13,23 @@ import logging
 import threading
 import numpy as np
 import cv2
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from dataclasses import dataclass, field
 from collections import deque
 
 from .framequeue import FrameQueue
 
+# Optional libjpeg-turbo binding (PyTurboJPEG). Encodes straight from the
+# BGR array without OpenCV's per-call parameter conversion; cv2.imencode is
+# used when it is not installed.
+_turbojpeg: Optional[Any] = None
+try:
+    from turbojpeg import TJPF_BGR, TJSAMP_420, TurboJPEG
+    _turbojpeg = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+except (ImportError, OSError, RuntimeError):
+    TURBOJPEG_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 # Each client buffers a couple of already-encoded frames. Small on purpose:
@@ -31,6 +42,11 @@ _CLIENT_QUEUE_SIZE = 3
 # halve (see MJPEGStreamer._resolve_sub_size).
 _DEFAULT_SUB_SIZE = (640, 360)
 
+# Frames up to this size are remembered (one raw copy) so an unchanged frame
+# -- e.g. a static scene or a paused source -- reuses the previous JPEG
+# instead of being encoded again. Larger frames are always encoded.
+_ENCODE_CACHE_MAX_BYTES = 3840 * 2160 * 3
+
 
 @dataclass
 class MJPEGClient:
@@ -58,6 +74,21 @@ class MJPEGStreamer:
     """
     
     BOUNDARY = b"--frame"
+
+    # Constant bytes around each part's Content-Length value and JPEG data
+    _PART_PREFIX = BOUNDARY + b"\r\nContent-Type: image/jpeg\r\nContent-Length: "
+    _PART_HEADER_END = b"\r\n\r\n"
+    _PART_END = b"\r\n"
+
+    # HTTP response headers for the stream; identical for every client, so
+    # built once. Shared -- callers must not modify it.
+    _HEADERS = [
+        ('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY.decode()[2:]}'),
+        ('Cache-Control', 'no-cache, no-store, must-revalidate'),
+        ('Pragma', 'no-cache'),
+        ('Expires', '0'),
+        ('Connection', 'close'),
+    ]
     
     def __init__(
         self,
@@ -65,6 +96,7 @@ class MJPEGStreamer:
         queue_size: int = 2,
         sub_width: Optional[int] = None,
         sub_height: Optional[int] = None,
+        use_turbojpeg: bool = False,
     ):
         """
         Initialize the MJPEG streamer.
@@ -80,11 +112,22 @@ class MJPEGStreamer:
                 assigned after construction via the ``sub_width`` attribute.
             sub_height: Optional fixed height (px) for the 'sub' stream
                 selector. See ``sub_width``.
+            use_turbojpeg: Encode colour frames with PyTurboJPEG when it is
+                installed (ignored otherwise).
         """
         self.quality = quality
         self.sub_width = sub_width
         self.sub_height = sub_height
-        self._clients: List[MJPEGClient] = []
+        self.use_turbojpeg = bool(use_turbojpeg) and TURBOJPEG_AVAILABLE
+        # cv2.imencode parameters, rebuilt only when quality changes
+        self._encode_params: List[int] = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+        # Connected clients keyed by id(client): O(1) removal, insertion order
+        # kept for the fan-out.
+        self._clients: Dict[int, MJPEGClient] = {}
+        # Immutable copy of the clients for the encode worker's fan-out.
+        # Rebuilt (under _lock) only when a client joins or leaves, so the
+        # worker reads it without locking or copying on every frame.
+        self._client_snapshot: tuple = ()
         self._lock = threading.Lock()
         self._last_frame: Optional[bytes] = None
         self._frame_count = 0
@@ -97,6 +140,14 @@ class MJPEGStreamer:
         self._frame_queue: FrameQueue = FrameQueue(maxsize=max(1, queue_size))
         self._worker: Optional[threading.Thread] = None
 
+        # Encode-worker-only state for skipping re-encodes of unchanged
+        # frames (see _is_repeat_frame): last raw frame and quality, and
+        # the chunks built from it.
+        self._prev_raw: Optional[np.ndarray] = None
+        self._prev_quality: Optional[int] = None
+        self._main_cache: Optional[tuple] = None  # (jpeg_bytes, chunk)
+        self._sub_cache: Optional[tuple] = None   # ((sub_w, sub_h), chunk)
+
         # Stats tracking
         self._start_time: Optional[float] = None
         self._frame_timestamps: deque = deque(maxlen=150)
@@ -133,8 +184,9 @@ class MJPEGStreamer:
         self._worker = None
 
         with self._lock:
-            clients = list(self._clients)
+            clients = list(self._clients.values())
             self._clients.clear()
+            self._client_snapshot = ()
         # Disconnect each client and wake its writer (blocked on its queue).
         for client in clients:
             client.connected = False
@@ -209,7 +261,8 @@ class MJPEGStreamer:
             stream = 'main'
         client = MJPEGClient(wfile=wfile, stream=stream)
         with self._lock:
-            self._clients.append(client)
+            self._clients[id(client)] = client
+            self._client_snapshot = tuple(self._clients.values())
         return client
     
     def remove_client(self, client: MJPEGClient):
@@ -218,8 +271,8 @@ class MJPEGStreamer:
         # Wake the client's writer if it is blocked waiting for frames.
         client.queue.close()
         with self._lock:
-            if client in self._clients:
-                self._clients.remove(client)
+            if self._clients.pop(id(client), None) is not None:
+                self._client_snapshot = tuple(self._clients.values())
 
     def stream_frame(self, frame: np.ndarray) -> bool:
         """
@@ -268,13 +321,49 @@ class MJPEGStreamer:
         return half_w, half_h
 
     def _wrap_multipart(self, jpeg_bytes: bytes) -> bytes:
-        """Wrap already-encoded JPEG bytes in one multipart/x-mixed-replace chunk."""
-        return (
-            self.BOUNDARY + b"\r\n"
-            b"Content-Type: image/jpeg\r\n"
-            b"Content-Length: " + str(len(jpeg_bytes)).encode() + b"\r\n"
-            b"\r\n" + jpeg_bytes + b"\r\n"
-        )
+        """Wrap already-encoded JPEG bytes in one multipart/x-mixed-replace chunk.
+
+        Joins the precomputed constant pieces in one pass so the (large)
+        JPEG payload is copied once. The result is shared by every client
+        the frame is fanned out to.
+        """
+        return b"".join((self._PART_PREFIX, b"%d" % len(jpeg_bytes),
+                         self._PART_HEADER_END, jpeg_bytes, self._PART_END))
+
+    def _encode_jpeg(self, frame: np.ndarray) -> Optional[bytes]:
+        """JPEG-encode a frame at the current quality; None on failure."""
+        if (self.use_turbojpeg and _turbojpeg is not None
+                and frame.ndim == 3 and frame.shape[2] == 3):
+            # Same 4:2:0 chroma subsampling as OpenCV's default
+            return _turbojpeg.encode(np.ascontiguousarray(frame), quality=self.quality,
+                                     pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420)
+        params = self._encode_params
+        if params[1] != self.quality:
+            params = self._encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.quality]
+        success, jpeg = cv2.imencode('.jpg', frame, params)
+        return jpeg.tobytes() if success else None
+
+    def _is_repeat_frame(self, frame: np.ndarray) -> bool:
+        """Return True if frame is identical to the previously encoded one.
+
+        Otherwise remember a copy of it for the next comparison. A byte
+        compare plus copy costs a fraction of a JPEG encode.
+        """
+        prev = self._prev_raw
+        if frame.nbytes > _ENCODE_CACHE_MAX_BYTES:
+            self._prev_raw = None
+            return False
+        if prev is not None and prev.shape == frame.shape and prev.dtype == frame.dtype:
+            if (self._main_cache is not None and self._prev_quality == self.quality
+                    and np.array_equal(prev, frame)):
+                return True
+        else:
+            prev = self._prev_raw = np.empty_like(frame)
+        np.copyto(prev, frame)
+        self._prev_quality = self.quality
+        self._main_cache = None
+        self._sub_cache = None
+        return False
 
     def _encode_loop(self):
         """Worker: encode each queued frame once and fan it out to clients.
@@ -289,22 +378,25 @@ class MJPEGStreamer:
             if frame is None:
                 continue
 
-            # Encode the main (full-resolution) frame to JPEG exactly once.
-            encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.quality]
-            try:
-                success, jpeg = cv2.imencode('.jpg', frame, encode_params)
-            except Exception as e:
-                logger.error(f"MJPEG encode error: {e}")
-                continue
-            if not success:
-                continue
+            # Encode the main (full-resolution) frame to JPEG exactly once,
+            # or not at all if it is unchanged since the last one.
+            repeat = self._is_repeat_frame(frame)
+            if repeat:
+                jpeg_bytes, main_frame_data = self._main_cache
+            else:
+                try:
+                    jpeg_bytes = self._encode_jpeg(frame)
+                except Exception as e:
+                    logger.error(f"MJPEG encode error: {e}")
+                    continue
+                if jpeg_bytes is None:
+                    continue
+                main_frame_data = self._wrap_multipart(jpeg_bytes)
+                self._main_cache = (jpeg_bytes, main_frame_data)
 
-            jpeg_bytes = jpeg.tobytes()
             self._last_frame = jpeg_bytes
-            main_frame_data = self._wrap_multipart(jpeg_bytes)
 
-            with self._lock:
-                clients = list(self._clients)
+            clients = self._client_snapshot
 
             # Only resize+encode a 'sub' frame if at least one connected
             # client actually wants it -- one encode per frame total, no
@@ -312,11 +404,16 @@ class MJPEGStreamer:
             sub_frame_data: Optional[bytes] = None
             if any(c.connected and c.stream == 'sub' for c in clients):
                 try:
-                    sub_w, sub_h = self._resolve_sub_size(frame)
-                    sub_frame = cv2.resize(frame, (sub_w, sub_h), interpolation=cv2.INTER_AREA)
-                    sub_success, sub_jpeg = cv2.imencode('.jpg', sub_frame, encode_params)
-                    if sub_success:
-                        sub_frame_data = self._wrap_multipart(sub_jpeg.tobytes())
+                    sub_size = self._resolve_sub_size(frame)
+                    sub_cache = self._sub_cache
+                    if repeat and sub_cache is not None and sub_cache[0] == sub_size:
+                        sub_frame_data = sub_cache[1]
+                    else:
+                        sub_frame = cv2.resize(frame, sub_size, interpolation=cv2.INTER_AREA)
+                        sub_jpeg = self._encode_jpeg(sub_frame)
+                        if sub_jpeg is not None:
+                            sub_frame_data = self._wrap_multipart(sub_jpeg)
+                            self._sub_cache = (sub_size, sub_frame_data)
                 except Exception as e:
                     logger.error(f"MJPEG sub-stream encode error: {e}")
 
@@ -359,15 +456,9 @@ class MJPEGStreamer:
         Get HTTP headers for MJPEG stream response.
         
         Returns:
-            List of (header_name, header_value) tuples
+            List of (header_name, header_value) tuples (shared; read-only)
         """
-        return [
-            ('Content-Type', f'multipart/x-mixed-replace; boundary={self.BOUNDARY.decode()[2:]}'),
-            ('Cache-Control', 'no-cache, no-store, must-revalidate'),
-            ('Pragma', 'no-cache'),
-            ('Expires', '0'),
-            ('Connection', 'close'),
-        ]
+        return self._HEADERS
 
 
 def check_go2rtc_running(host: str = "127.0.0.1", port: int = 1984, timeout: float = 1.0) -> bool:
@@ -389,11 +480,7 @@ def check_go2rtc_running(host: str = "127.0.0.1", port: int = 1984, timeout: flo
     # First, a cheap TCP connect: if nothing is even listening on the API
     # port, go2rtc definitely is not running.
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        result = sock.connect_ex((host, port))
-        sock.close()
-
+        result = _tcp_connect(host, port, timeout)
         if result != 0:
             logger.debug("go2rtc not detected: TCP connect to %s:%s failed (errno %s)",
                          host, port, result)
@@ -449,10 +536,23 @@ def check_rtsp_port_available(host: str = "127.0.0.1", port: int = 8554, timeout
     import socket
     
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        result = sock.connect_ex((host, port))
-        sock.close()
-        return result == 0
+        return _tcp_connect(host, port, timeout) == 0
     except (socket.error, socket.timeout):
         return False
+
+
+def _tcp_connect(host: str, port: int, timeout: float) -> int:
+    """Try a TCP connect and return its errno (0 on success).
+
+    A refused connection (nothing listening locally) returns at once; only an
+    unreachable host waits, and never longer than timeout. The socket is
+    always closed, even if connect_ex raises.
+    """
+    import socket
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        return sock.connect_ex((host, port))
+    finally:
+        sock.close()
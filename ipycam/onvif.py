@@ -3,14 +3,16 @@
 
 import os
 import re
+import functools
 import time
 import uuid
+import secrets
 import base64
 import hashlib
 import hmac
 from datetime import datetime, timezone
 from xml.sax.saxutils import escape
-from typing import Dict, Optional, TYPE_CHECKING
+from typing import Callable, Dict, Optional, Tuple, TYPE_CHECKING
 
 try:
     from .config import CameraConfig
@@ -27,18 +29,139 @@ if TYPE_CHECKING:
 # Maximum tolerated clock skew (seconds) for a WS-Security Created timestamp.
 WSU_MAX_SKEW_SECONDS = 300
 
+# SOAP templates that are NOT response bodies: complete documents with their
+# own envelope (fault, WS-Discovery probe match), the envelope itself, and
+# fragments rendered into other templates. Everything else is pre-wrapped in
+# the envelope at load time.
+UNWRAPPED_TEMPLATES = frozenset({'envelope', 'fault', 'probe_match', 'ptz_preset_item'})
+
+# PTZ vector parsing for AbsoluteMove/RelativeMove/ContinuousMove: the
+# opening/closing tags of the container element, then each PanTilt/Zoom
+# element with its raw attribute text, then the x/y attributes within that text.
+_SECTION_RES = {
+    tag: (re.compile(rf'<(?:\w+:)?{tag}\b[^>]*>'), re.compile(rf'</(?:\w+:)?{tag}>'))
+    for tag in ('Position', 'Translation', 'Velocity')
+}
+_PTZ_VECTOR_RE = re.compile(r'<(?:\w+:)?(PanTilt|Zoom)\b([^>]*)>')
+_X_ATTR_RE = re.compile(r'\bx="([^"]*)"')
+_Y_ATTR_RE = re.compile(r'\by="([^"]*)"')
+
+
+# Per-tag patterns are compiled once per distinct tag/attribute; the set of
+# tags the handlers ask for is small and fixed.
+@functools.lru_cache(maxsize=None)
+def _tag_value_re(tag: str) -> re.Pattern:
+    return re.compile(rf'<(?:\w+:)?{tag}[^>]*>([^<]*)</(?:\w+:)?{tag}>')
+
+
+@functools.lru_cache(maxsize=None)
+def _tag_attr_re(tag: str, attr: str) -> re.Pattern:
+    return re.compile(rf'<(?:\w+:)?{tag}[^>]*{attr}="([^"]*)"')
+
+
+@functools.lru_cache(maxsize=None)
+def _ws_value_re(tag: str) -> re.Pattern:
+    return re.compile(rf'<(?:\w+:)?{tag}\b[^>]*>([^<]*)</(?:\w+:)?{tag}>')
+
+
+@functools.lru_cache(maxsize=None)
+def _ws_attr_re(tag: str, attr: str) -> re.Pattern:
+    return re.compile(rf'<(?:\w+:)?{tag}\b[^>]*\b{attr}="([^"]*)"')
+
+
+# VMS clients re-send byte-identical PTZ requests (Stop, GotoPreset), so tag
+# lookups are memoized on (body, tag). Only bodies up to this size are kept
+# so the cache stays small.
+_XML_VALUE_CACHE_MAX_BODY = 4096
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_tag_value(body: str, tag: str) -> Optional[str]:
+    match = _tag_value_re(tag).search(body)
+    return match.group(1) if match else None
+
+
+# A {{var}} placeholder in a SOAP template.
+_PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+
+
+class _KeepPlaceholders(dict):
+    """Template values that render missing keys back as {{key}}."""
+
+    def __missing__(self, key):
+        return f'{{{{{key}}}}}'
+
+
+@functools.lru_cache(maxsize=None)
+def _load_soap_templates() -> Tuple[Dict[str, str], Dict[str, str], str]:
+    """Load all SOAP templates from static/soap/, once per process.
+
+    Returns (templates, formats, preset_item_fmt). The templates are static
+    assets, so every ONVIFService shares the result; it must not be modified.
+    """
+    templates: Dict[str, str] = {}
+    soap_dir = os.path.join(os.path.dirname(__file__), 'static', 'soap')
+    # scandir hands back the full path with each entry, and the templates
+    # are static assets, so read raw bytes and decode once rather than
+    # going through text-mode newline translation.
+    with os.scandir(soap_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.xml') and entry.is_file():
+                template_name = entry.name[:-4]  # Remove .xml
+                with open(entry.path, 'rb') as f:
+                    templates[template_name] = f.read().decode('utf-8')
+    # Every response body goes out inside the same SOAP envelope, so splice
+    # the envelope around each body template once here instead of
+    # rendering and re-wrapping it on every request.
+    env_prefix, _, env_suffix = templates.get('envelope', '').partition('{{body}}')
+    for name, template in templates.items():
+        if name not in UNWRAPPED_TEMPLATES:
+            templates[name] = f"{env_prefix}{template}{env_suffix}"
+    # _render fills templates with a single %-format pass, so convert each
+    # {{var}} placeholder to %(var)s once here.
+    formats = {
+        name: _PLACEHOLDER_RE.sub(r'%(\1)s', template.replace('%', '%%'))
+        for name, template in templates.items()
+    }
+    # GetPresets renders one item per preset; turn the {{var}} snippet into
+    # a str.format string up front (it contains no other braces).
+    preset_item_fmt = (
+        templates.get('ptz_preset_item', '').replace('{{', '{').replace('}}', '}')
+    )
+    return templates, formats, preset_item_fmt
+
+
+# SOAP actions served only by the PTZ service. handle_action only routes these
+# when the service was constructed with a PTZController.
+PTZ_ACTIONS = frozenset({
+    'GetNodes', 'GetNode', 'GetStatus', 'ContinuousMove', 'Stop',
+    'AbsoluteMove', 'RelativeMove', 'GotoHomePosition', 'GetPresets',
+    'SetPreset', 'GotoPreset',
+})
+
+# Generic action names the device/media services also receive (NVRs call
+# GetServiceCapabilities during discovery). They are only treated as PTZ
+# actions when the action URI is in the PTZ namespace.
+SHARED_PTZ_ACTIONS = frozenset({
+    'GetConfigurations', 'GetConfiguration', 'GetServiceCapabilities',
+})
+PTZ_NAMESPACE = 'ver20/ptz/wsdl'
+
+
+def _is_ptz_action(key: str, action: str) -> bool:
+    """Whether handler key, matched for this SOAP action, is a PTZ request."""
+    return key in PTZ_ACTIONS or (key in SHARED_PTZ_ACTIONS and PTZ_NAMESPACE in action)
+
 
 def _ws_extract(soap_body: str, tag: str) -> Optional[str]:
     """Extract the text of a WS-Security element, tolerant of ns prefixes."""
-    pattern = rf'<(?:\w+:)?{tag}\b[^>]*>([^<]*)</(?:\w+:)?{tag}>'
-    match = re.search(pattern, soap_body)
+    match = _ws_value_re(tag).search(soap_body)
     return match.group(1) if match else None
 
 
 def _ws_extract_attr(soap_body: str, tag: str, attr: str) -> Optional[str]:
     """Extract an attribute value from a WS-Security element (ns tolerant)."""
-    pattern = rf'<(?:\w+:)?{tag}\b[^>]*\b{attr}="([^"]*)"'
-    match = re.search(pattern, soap_body)
+    match = _ws_attr_re(tag, attr).search(soap_body)
     return match.group(1) if match else None
 
 
@@ -113,71 +236,114 @@ def verify_ws_username_token(soap_body: str, username: str, password: str) -> bo
 
 class ONVIFService:
     """ONVIF Device and Media Service handler"""
+
+    # Fixed attribute set: no per-instance __dict__, and attribute access on
+    # the request path goes through slot descriptors.
+    __slots__ = ('config', 'ptz', 'device_uuid', '_templates', '_formats',
+                 '_preset_item_fmt', '_time_cache', '_response_cache',
+                 '_dispatch', '_probe_match_fmt')
     
     def __init__(self, config: CameraConfig, ptz_controller: Optional['PTZController'] = None):
         self.config = config
         self.ptz = ptz_controller
         self.device_uuid = f"urn:uuid:{uuid.uuid4()}"
-        self._templates: Dict[str, str] = {}
+        # (second, response) for get_system_date_time
+        self._time_cache = (-1, '')
+        # template name -> (values, response) for _render_cached
+        self._response_cache: Dict[str, tuple] = {}
+        # ((camera_name, onvif_url), format) for create_probe_match
+        self._probe_match_fmt: Optional[tuple] = None
         self._load_templates()
+        self._dispatch = self._build_dispatch()
     
     def _load_templates(self):
-        """Load all SOAP templates from static/soap/"""
-        soap_dir = os.path.join(os.path.dirname(__file__), 'static', 'soap')
-        for filename in os.listdir(soap_dir):
-            if filename.endswith('.xml'):
-                template_name = filename[:-4]  # Remove .xml
-                with open(os.path.join(soap_dir, filename), 'r', encoding='utf-8') as f:
-                    self._templates[template_name] = f.read()
+        """Attach the process-wide SOAP templates (see _load_soap_templates)"""
+        self._templates, self._formats, self._preset_item_fmt = _load_soap_templates()
     
     def _render(self, template_name: str, **kwargs) -> str:
         """Render a template with the given variables"""
-        template = self._templates.get(template_name, '')
-        for key, value in kwargs.items():
-            template = template.replace(f'{{{{{key}}}}}', str(value))
-        return template
-    
-    def _wrap_envelope(self, body: str) -> str:
-        """Wrap body content in SOAP envelope"""
-        return self._render('envelope', body=body)
+        fmt = self._formats.get(template_name)
+        if fmt is None:
+            return ''
+        try:
+            return fmt % kwargs
+        except KeyError:
+            # Placeholders without a value are left as-is
+            return fmt % _KeepPlaceholders(kwargs)
+
+    def _render_cached(self, template_name: str, **kwargs) -> str:
+        """Like _render, but reuse the last response while the values match.
+
+        For config-derived responses that VMS clients poll repeatedly. Keying
+        on the values (rather than caching once) keeps responses correct
+        when the config is edited at runtime.
+        """
+        values = tuple(kwargs.values())
+        cached = self._response_cache.get(template_name)
+        if cached is not None and cached[0] == values:
+            return cached[1]
+        response = self._render(template_name, **kwargs)
+        self._response_cache[template_name] = (values, response)
+        return response
 
     def handle_action(self, action: str, body: str) -> Optional[str]:
         """Route SOAP actions to handlers"""
-        handlers = {
-            'GetSystemDateAndTime': self.get_system_date_time,
-            'GetDeviceInformation': self.get_device_information,
-            'GetCapabilities': self.get_capabilities,
-            'GetServices': self.get_services,
-            'GetScopes': self.get_scopes,
-            'GetUsers': self.get_users,
-            'GetProfiles': self.get_profiles,
-            'GetStreamUri': lambda: self.get_stream_uri(body),
-            'GetSnapshotUri': lambda: self.get_snapshot_uri(body),
-            'GetVideoEncoderConfiguration': self.get_video_encoder_configuration,
-            'GetVideoSourceConfiguration': self.get_video_source_configuration,
-            'GetAudioDecoderConfigurations': self.get_audio_decoder_configurations,
-            # PTZ handlers
-            'GetNodes': self.ptz_get_nodes,
-            'GetNode': self.ptz_get_node,
-            'GetConfigurations': self.ptz_get_configurations,
-            'GetConfiguration': self.ptz_get_configurations,
-            'GetServiceCapabilities': self.ptz_get_service_capabilities,
-            'GetStatus': lambda: self.ptz_get_status(body),
-            'ContinuousMove': lambda: self.ptz_continuous_move(body),
-            'Stop': lambda: self.ptz_stop(body),
-            'AbsoluteMove': lambda: self.ptz_absolute_move(body),
-            'RelativeMove': lambda: self.ptz_relative_move(body),
-            'GotoHomePosition': lambda: self.ptz_goto_home(body),
-            'GetPresets': lambda: self.ptz_get_presets(body),
-            'SetPreset': lambda: self.ptz_set_preset(body),
-            'GotoPreset': lambda: self.ptz_goto_preset(body),
-        }
-        
-        for key, handler in handlers.items():
+        # SOAPAction headers carry the full action URI; the handler name is
+        # its last path segment, which resolves in a single dict lookup.
+        key = action.rpartition('/')[2]
+        handler = self._dispatch.get(key)
+        if handler is not None and (self.ptz is not None or not _is_ptz_action(key, action)):
+            return handler(body)
+
+        # Anything else gets the original ordered substring match
+        for key, handler in self._dispatch.items():
             if key in action:
-                return handler()
+                if self.ptz is None and _is_ptz_action(key, action):
+                    # No PTZ controller: don't pretend to be a PTZ service.
+                    continue
+                return handler(body)
         
         return self.fault(f"Action not supported: {action}")
+
+    def _build_dispatch(self) -> Dict[str, Callable[[str], str]]:
+        """Map each SOAP action name to a handler taking the request body.
+
+        Built once per service. Order matters for the substring fallback in
+        handle_action: longer names precede their prefixes (GetNodes before
+        GetNode).
+        """
+        def no_body(method):
+            return lambda body: method()
+
+        return {
+            'GetSystemDateAndTime': no_body(self.get_system_date_time),
+            'GetDeviceInformation': no_body(self.get_device_information),
+            'GetCapabilities': no_body(self.get_capabilities),
+            'GetServices': no_body(self.get_services),
+            'GetScopes': no_body(self.get_scopes),
+            'GetUsers': no_body(self.get_users),
+            'GetProfiles': no_body(self.get_profiles),
+            'GetStreamUri': self.get_stream_uri,
+            'GetSnapshotUri': self.get_snapshot_uri,
+            'GetVideoEncoderConfiguration': no_body(self.get_video_encoder_configuration),
+            'GetVideoSourceConfiguration': no_body(self.get_video_source_configuration),
+            'GetAudioDecoderConfigurations': no_body(self.get_audio_decoder_configurations),
+            # PTZ handlers
+            'GetNodes': no_body(self.ptz_get_nodes),
+            'GetNode': no_body(self.ptz_get_node),
+            'GetConfigurations': no_body(self.ptz_get_configurations),
+            'GetConfiguration': no_body(self.ptz_get_configurations),
+            'GetServiceCapabilities': no_body(self.ptz_get_service_capabilities),
+            'GetStatus': self.ptz_get_status,
+            'ContinuousMove': self.ptz_continuous_move,
+            'Stop': self.ptz_stop,
+            'AbsoluteMove': self.ptz_absolute_move,
+            'RelativeMove': self.ptz_relative_move,
+            'GotoHomePosition': self.ptz_goto_home,
+            'GetPresets': self.ptz_get_presets,
+            'SetPreset': self.ptz_set_preset,
+            'GotoPreset': self.ptz_goto_preset,
+        }
     
     def fault(self, reason: str) -> str:
         # Reasons can echo request-derived text (e.g. an unknown SOAPAction),
@@ -206,49 +372,51 @@ class ONVIFService:
         return int(bitrate)
 
     def get_system_date_time(self) -> str:
-        now = time.gmtime()
-        body = self._render('get_system_date_time',
+        # NVRs tend to fire several GetSystemDateAndTime probes back to back;
+        # the response only has 1 s resolution, so reuse it within a second.
+        second = int(time.time())
+        cached_second, cached_resp = self._time_cache
+        if second == cached_second:
+            return cached_resp
+        now = time.gmtime(second)
+        response = self._render('get_system_date_time',
             hour=now.tm_hour, minute=now.tm_min, second=now.tm_sec,
             year=now.tm_year, month=now.tm_mon, day=now.tm_mday)
-        return self._wrap_envelope(body)
+        self._time_cache = (second, response)
+        return response
 
     def get_device_information(self) -> str:
         # These identity strings are config/user-controlled (editable via the
         # web API), so XML-escape them before template substitution.
-        body = self._render('get_device_information',
+        return self._render_cached('get_device_information',
             manufacturer=escape(str(self.config.manufacturer)),
             model=escape(str(self.config.model)),
             firmware_version=escape(str(self.config.firmware_version)),
             serial_number=escape(str(self.config.serial_number)))
-        return self._wrap_envelope(body)
 
     def get_capabilities(self) -> str:
-        device_url = f"http://{self.config.local_ip}:{self.config.onvif_port}/onvif/device_service"
-        media_url = f"http://{self.config.local_ip}:{self.config.onvif_port}/onvif/media_service"
-        ptz_url = f"http://{self.config.local_ip}:{self.config.onvif_port}/onvif/ptz_service"
-        body = self._render('get_capabilities', device_url=device_url, media_url=media_url, ptz_url=ptz_url)
-        return self._wrap_envelope(body)
+        return self._render_cached('get_capabilities',
+            device_url=self.config.device_url,
+            media_url=self.config.media_url,
+            ptz_url=self.config.ptz_url)
 
     def get_services(self) -> str:
-        device_url = f"http://{self.config.local_ip}:{self.config.onvif_port}/onvif/device_service"
-        media_url = f"http://{self.config.local_ip}:{self.config.onvif_port}/onvif/media_service"
-        ptz_url = f"http://{self.config.local_ip}:{self.config.onvif_port}/onvif/ptz_service"
-        body = self._render('get_services', device_url=device_url, media_url=media_url, ptz_url=ptz_url)
-        return self._wrap_envelope(body)
+        return self._render_cached('get_services',
+            device_url=self.config.device_url,
+            media_url=self.config.media_url,
+            ptz_url=self.config.ptz_url)
 
     def get_scopes(self) -> str:
-        body = self._render('get_scopes', camera_name=escape(str(self.config.name)))
-        return self._wrap_envelope(body)
+        return self._render_cached('get_scopes', camera_name=escape(str(self.config.name)))
 
     def get_users(self) -> str:
         # Reflect the configured user when auth is enabled; otherwise keep the
         # previous static 'admin' response. Escape for safe XML substitution.
         username = self.config.username if self.config.auth_enabled else 'admin'
-        body = self._render('get_users', username=escape(username))
-        return self._wrap_envelope(body)
+        return self._render('get_users', username=escape(username))
 
     def get_profiles(self) -> str:
-        body = self._render('get_profiles',
+        return self._render_cached('get_profiles',
             main_width=self.config.main_width,
             main_height=self.config.main_height,
             main_fps=self.config.main_fps,
@@ -257,161 +425,162 @@ class ONVIFService:
             sub_height=self.config.sub_height,
             sub_fps=self.config.sub_fps,
             sub_bitrate_kbps=self._bitrate_to_kbps(self.config.sub_bitrate))
-        return self._wrap_envelope(body)
 
     def get_stream_uri(self, body: str) -> str:
         uri = self.config.main_stream_rtsp
         if "Sub" in body or "Profile_2" in body:
             uri = self.config.sub_stream_rtsp
         # Stream names inside the URI are config-editable; escape for XML.
-        body = self._render('get_stream_uri', stream_uri=escape(uri))
-        return self._wrap_envelope(body)
+        return self._render('get_stream_uri', stream_uri=escape(uri))
 
     def get_snapshot_uri(self, body: str) -> str:
         # Advertise onvif_port: the snapshot is served by the main HTTP server
         # (which listens on onvif_port). Nothing binds web_port, so the old URL
         # pointed at a dead port.
-        uri = f"http://{self.config.local_ip}:{self.config.onvif_port}/{self.config.snapshot_url}"
-        body = self._render('get_snapshot_uri', snapshot_uri=escape(uri))
-        return self._wrap_envelope(body)
+        return self._render('get_snapshot_uri', snapshot_uri=escape(self.config.snapshot_uri))
 
     def get_video_encoder_configuration(self) -> str:
-        body = self._render('get_video_encoder_configuration',
+        return self._render_cached('get_video_encoder_configuration',
             main_width=self.config.main_width,
             main_height=self.config.main_height,
             main_fps=self.config.main_fps,
             main_bitrate_kbps=self._bitrate_to_kbps(self.config.main_bitrate))
-        return self._wrap_envelope(body)
 
     def get_video_source_configuration(self) -> str:
-        body = self._render('get_video_source_configuration',
+        return self._render_cached('get_video_source_configuration',
             main_width=self.config.main_width,
             main_height=self.config.main_height)
-        return self._wrap_envelope(body)
 
     def get_audio_decoder_configurations(self) -> str:
-        body = self._render('get_audio_decoder_configurations')
-        return self._wrap_envelope(body)
+        return self._render_cached('get_audio_decoder_configurations')
 
     def create_probe_match(self, relates_to: str) -> str:
         """Create WS-Discovery ProbeMatch response"""
-        message_id = f"urn:uuid:{uuid.uuid4()}"
-        return self._render('probe_match',
-            message_id=message_id,
-            relates_to=escape(str(relates_to)),
-            device_uuid=self.device_uuid,
-            camera_name=escape(str(self.config.name)),
-            onvif_url=escape(self.config.onvif_url))
+        # Every probe in a discovery burst gets the same response apart from
+        # the two message IDs, so the constant fields are filled in once
+        # (per config values) and only the IDs are substituted per probe.
+        camera_name = escape(str(self.config.name))
+        onvif_url = escape(self.config.onvif_url)
+        cached = self._probe_match_fmt
+        if cached is None or cached[0] != (camera_name, onvif_url):
+            # This format goes through two %-passes: the template's literal
+            # '%' must survive both, the constant values only the second.
+            fmt = self._formats.get('probe_match', '').replace('%%', '%%%%') % {
+                'message_id': '%(message_id)s',
+                'relates_to': '%(relates_to)s',
+                'device_uuid': self.device_uuid.replace('%', '%%'),
+                'camera_name': camera_name.replace('%', '%%'),
+                'onvif_url': onvif_url.replace('%', '%%'),
+            }
+            cached = self._probe_match_fmt = ((camera_name, onvif_url), fmt)
+        return cached[1] % {
+            'message_id': f"urn:uuid:{uuid.uuid4()}",
+            'relates_to': escape(str(relates_to)),
+        }
 
     # === PTZ Service Handlers ===
     
     def _extract_xml_value(self, body: str, tag: str) -> Optional[str]:
         """Extract value from XML tag, handling namespaces"""
+        if len(body) <= _XML_VALUE_CACHE_MAX_BODY:
+            return _cached_tag_value(body, tag)
         # Match with or without namespace prefix
-        pattern = rf'<(?:\w+:)?{tag}[^>]*>([^<]*)</(?:\w+:)?{tag}>'
-        match = re.search(pattern, body)
+        match = _tag_value_re(tag).search(body)
         return match.group(1) if match else None
     
     def _extract_xml_attr(self, body: str, tag: str, attr: str) -> Optional[str]:
         """Extract attribute value from XML tag"""
-        pattern = rf'<(?:\w+:)?{tag}[^>]*{attr}="([^"]*)"'
-        match = re.search(pattern, body)
+        match = _tag_attr_re(tag, attr).search(body)
         return match.group(1) if match else None
     
     def _extract_velocity(self, body: str) -> tuple:
         """Extract pan, tilt, zoom velocity from SOAP body"""
-        pan_speed = 0.0
-        tilt_speed = 0.0
-        zoom_speed = 0.0
-        
-        # Look for PanTilt x="..." y="..."
-        pt_match = re.search(r'<(?:\w+:)?PanTilt[^>]*x="([^"]*)"[^>]*y="([^"]*)"', body)
-        if pt_match:
-            try:
-                pan_speed = float(pt_match.group(1))
-                tilt_speed = float(pt_match.group(2))
-            except ValueError:
-                pass
-        
-        # Look for Zoom x="..."
-        zoom_match = re.search(r'<(?:\w+:)?Zoom[^>]*x="([^"]*)"', body)
-        if zoom_match:
-            try:
-                zoom_speed = float(zoom_match.group(1))
-            except ValueError:
-                pass
-        
-        return pan_speed, tilt_speed, zoom_speed
+        # Clients that omit the <Velocity> wrapper are still honoured.
+        return self._extract_ptz_vector(body, 'Velocity', 0.0, lenient=True)
     
+    @staticmethod
+    def _extract_section(body: str, tag: str) -> Optional[str]:
+        """Return the content of the first <tag> element (ns tolerant).
+
+        An unterminated element runs to the end of the body, matching the
+        lenient behaviour of the other extractors.
+        """
+        open_re, close_re = _SECTION_RES[tag]
+        start = open_re.search(body)
+        if not start:
+            return None
+        end = close_re.search(body, start.end())
+        return body[start.end():end.start() if end else len(body)]
+
+    @staticmethod
+    def _parse_ptz_vector(section: str, pan, tilt, zoom) -> tuple:
+        """Parse the first PanTilt x/y and Zoom x attributes in one scan.
+
+        Components that are missing or non-numeric keep the values passed in.
+        """
+        found_pan_tilt = False
+        found_zoom = False
+        for match in _PTZ_VECTOR_RE.finditer(section):
+            kind, attrs = match.group(1), match.group(2)
+            x = _X_ATTR_RE.search(attrs)
+            if kind == 'PanTilt':
+                y = _Y_ATTR_RE.search(attrs)
+                if found_pan_tilt or not (x and y):
+                    continue
+                found_pan_tilt = True
+                try:
+                    pan, tilt = float(x.group(1)), float(y.group(1))
+                except ValueError:
+                    pass
+            else:
+                if found_zoom or not x:
+                    continue
+                found_zoom = True
+                try:
+                    zoom = float(x.group(1))
+                except ValueError:
+                    pass
+            if found_pan_tilt and found_zoom:
+                break
+        return pan, tilt, zoom
+
+    def _extract_ptz_vector(self, body: str, tag: str, default, lenient: bool = False) -> tuple:
+        """Extract the (pan, tilt, zoom) vector inside <tag>.
+
+        Only the <tag> element is scanned, not the whole (possibly
+        WS-Security laden) envelope. Without one, every component is default,
+        or with lenient the whole body is scanned instead.
+        """
+        section = self._extract_section(body, tag)
+        if section is None:
+            if not lenient:
+                return default, default, default
+            section = body
+        return self._parse_ptz_vector(section, default, default, default)
+
     def _extract_position(self, body: str) -> tuple:
         """Extract pan, tilt, zoom position from SOAP body"""
-        pan = None
-        tilt = None
-        zoom = None
-        
-        # Look for Position > PanTilt x="..." y="..."
-        pt_match = re.search(r'<(?:\w+:)?Position[^>]*>.*?<(?:\w+:)?PanTilt[^>]*x="([^"]*)"[^>]*y="([^"]*)"', body, re.DOTALL)
-        if pt_match:
-            try:
-                pan = float(pt_match.group(1))
-                tilt = float(pt_match.group(2))
-            except ValueError:
-                pass
-        
-        # Look for Position > Zoom x="..."
-        zoom_match = re.search(r'<(?:\w+:)?Position[^>]*>.*?<(?:\w+:)?Zoom[^>]*x="([^"]*)"', body, re.DOTALL)
-        if zoom_match:
-            try:
-                zoom = float(zoom_match.group(1))
-            except ValueError:
-                pass
-        
-        return pan, tilt, zoom
+        return self._extract_ptz_vector(body, 'Position', None)
     
     def _extract_translation(self, body: str) -> tuple:
         """Extract pan, tilt, zoom translation from SOAP body"""
-        pan = 0.0
-        tilt = 0.0
-        zoom = 0.0
-        
-        # Look for Translation > PanTilt x="..." y="..."
-        pt_match = re.search(r'<(?:\w+:)?Translation[^>]*>.*?<(?:\w+:)?PanTilt[^>]*x="([^"]*)"[^>]*y="([^"]*)"', body, re.DOTALL)
-        if pt_match:
-            try:
-                pan = float(pt_match.group(1))
-                tilt = float(pt_match.group(2))
-            except ValueError:
-                pass
-        
-        # Look for Translation > Zoom x="..."
-        zoom_match = re.search(r'<(?:\w+:)?Translation[^>]*>.*?<(?:\w+:)?Zoom[^>]*x="([^"]*)"', body, re.DOTALL)
-        if zoom_match:
-            try:
-                zoom = float(zoom_match.group(1))
-            except ValueError:
-                pass
-        
-        return pan, tilt, zoom
+        return self._extract_ptz_vector(body, 'Translation', 0.0)
 
     def ptz_get_nodes(self) -> str:
         """Handle GetNodes request - returns list of PTZ nodes"""
-        body = self._render('ptz_get_nodes')
-        return self._wrap_envelope(body)
+        return self._render('ptz_get_nodes')
 
     def ptz_get_node(self) -> str:
         """Handle GetNode request - returns single PTZ node details"""
-        body = self._render('ptz_get_node')
-        return self._wrap_envelope(body)
+        return self._render('ptz_get_node')
 
     def ptz_get_service_capabilities(self) -> str:
         """Handle GetServiceCapabilities request for PTZ service"""
-        body = self._render('ptz_get_service_capabilities')
-        return self._wrap_envelope(body)
+        return self._render('ptz_get_service_capabilities')
 
     def ptz_get_configurations(self) -> str:
         """Handle GetConfigurations request"""
-        body = self._render('ptz_get_configurations')
-        return self._wrap_envelope(body)
+        return self._render('ptz_get_configurations')
     
     def ptz_get_status(self, body: str) -> str:
         """Handle GetStatus request"""
@@ -425,9 +594,8 @@ class ONVIFService:
             pan, tilt, zoom = 0.0, 0.0, 0.0
             moving = 'IDLE'
         
-        response = self._render('ptz_get_status',
+        return self._render('ptz_get_status',
             pan=pan, tilt=tilt, zoom=zoom, move_status=moving)
-        return self._wrap_envelope(response)
     
     def ptz_continuous_move(self, body: str) -> str:
         """Handle ContinuousMove request"""
@@ -436,8 +604,7 @@ class ONVIFService:
         if self.ptz:
             self.ptz.continuous_move(pan_speed, tilt_speed, zoom_speed)
         
-        response = self._render('ptz_continuous_move')
-        return self._wrap_envelope(response)
+        return self._render('ptz_continuous_move')
     
     def ptz_stop(self, body: str) -> str:
         """Handle Stop request"""
@@ -456,8 +623,7 @@ class ONVIFService:
         if self.ptz:
             self.ptz.stop_movement(pan_tilt, zoom)
         
-        response = self._render('ptz_stop')
-        return self._wrap_envelope(response)
+        return self._render('ptz_stop')
     
     def ptz_absolute_move(self, body: str) -> str:
         """Handle AbsoluteMove request"""
@@ -466,8 +632,7 @@ class ONVIFService:
         if self.ptz:
             self.ptz.absolute_move(pan, tilt, zoom)
         
-        response = self._render('ptz_absolute_move')
-        return self._wrap_envelope(response)
+        return self._render('ptz_absolute_move')
     
     def ptz_relative_move(self, body: str) -> str:
         """Handle RelativeMove request"""
@@ -476,16 +641,14 @@ class ONVIFService:
         if self.ptz:
             self.ptz.relative_move(pan, tilt, zoom)
         
-        response = self._render('ptz_relative_move')
-        return self._wrap_envelope(response)
+        return self._render('ptz_relative_move')
     
     def ptz_goto_home(self, body: str) -> str:
         """Handle GotoHomePosition request"""
         if self.ptz:
             self.ptz.goto_home()
         
-        response = self._render('ptz_goto_home')
-        return self._wrap_envelope(response)
+        return self._render('ptz_goto_home')
     
     def ptz_get_presets(self, body: str) -> str:
         """Handle GetPresets request"""
@@ -493,23 +656,19 @@ class ONVIFService:
         
         if self.ptz:
             presets = self.ptz.get_presets()
-            for token, preset in presets.items():
-                # Token and name originate from client SetPreset requests --
-                # escape them so they cannot inject markup into the response.
-                # The token sits in an attribute, so quotes must be escaped too.
-                safe_token = escape(str(preset.token), {'"': '&quot;'})
-                safe_name = escape(str(preset.name))
-                preset_items += f"""
-      <tptz:Preset token="{safe_token}">
-        <tt:Name>{safe_name}</tt:Name>
-        <tt:PTZPosition>
-          <tt:PanTilt x="{preset.pan}" y="{preset.tilt}"/>
-          <tt:Zoom x="{preset.zoom}"/>
-        </tt:PTZPosition>
-      </tptz:Preset>"""
+            item_fmt = self._preset_item_fmt
+            # Token and name originate from client SetPreset requests --
+            # escape them so they cannot inject markup into the response.
+            # The token sits in an attribute, so quotes must be escaped too.
+            preset_items = ''.join([
+                item_fmt.format(
+                    token=escape(str(preset.token), {'"': '&quot;'}),
+                    name=escape(str(preset.name)),
+                    pan=preset.pan, tilt=preset.tilt, zoom=preset.zoom)
+                for preset in presets.values()
+            ])
         
-        response = self._render('ptz_get_presets', presets=preset_items)
-        return self._wrap_envelope(response)
+        return self._render('ptz_get_presets', presets=preset_items)
     
     def ptz_set_preset(self, body: str) -> str:
         """Handle SetPreset request"""
@@ -518,14 +677,13 @@ class ONVIFService:
         
         if not preset_token:
             # Generate new token
-            preset_token = f"preset_{uuid.uuid4().hex[:8]}"
+            preset_token = f"preset_{secrets.token_hex(4)}"
         
         if self.ptz:
             self.ptz.set_preset(preset_token, preset_name)
 
         # The token may be client-supplied; escape it before echoing it back.
-        response = self._render('ptz_set_preset', preset_token=escape(preset_token))
-        return self._wrap_envelope(response)
+        return self._render('ptz_set_preset', preset_token=escape(preset_token))
     
     def ptz_goto_preset(self, body: str) -> str:
         """Handle GotoPreset request"""
@@ -534,5 +692,4 @@ class ONVIFService:
         if self.ptz and preset_token:
             self.ptz.goto_preset(preset_token)
         
-        response = self._render('ptz_goto_preset')
-        return self._wrap_envelope(response)
+        return self._render('ptz_goto_preset')
@@ -10,33 +10,79 @@ Also supports external hardware controllers via callbacks for controlling
 physical motors, servos, gimbals, etc.
 """
 
+import os
 import threading
+import tempfile
 import time
 import json
 import logging
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, asdict
-from typing import Dict, Optional, List, Callable, Protocol, runtime_checkable
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, List, Callable, Protocol, runtime_checkable
 import numpy as np
 import cv2
 
 logger = logging.getLogger(__name__)
 
+# Continuous-move integration period (~60 Hz), in nanoseconds.
+MOVEMENT_PERIOD_NS = 16_000_000
 
-@dataclass
+# Delay before a preset change is written to disk; further changes within
+# the window are coalesced into the same write.
+PRESET_SAVE_DELAY = 0.25
+
+# apply_ptz resize quality modes:
+#   'auto'    - INTER_AREA when shrinking the crop, INTER_LINEAR when enlarging
+#   'quality' - INTER_AREA when shrinking, INTER_CUBIC when enlarging
+#   'fast'    - INTER_NEAREST in both directions
+RESIZE_QUALITY_MODES = {
+    'auto': (cv2.INTER_AREA, cv2.INTER_LINEAR),
+    'quality': (cv2.INTER_AREA, cv2.INTER_CUBIC),
+    'fast': (cv2.INTER_NEAREST, cv2.INTER_NEAREST),
+}
+
+
+# PTZState and PTZVelocity are read on every movement tick, so they are
+# plain __slots__ classes (slot descriptors, no per-instance __dict__)
+# rather than dataclasses; dataclass(slots=True) needs Python 3.10.
 class PTZState:
     """Current PTZ position state"""
-    pan: float = 0.0    # -1.0 to 1.0 (left to right)
-    tilt: float = 0.0   # -1.0 to 1.0 (down to up)  
-    zoom: float = 0.0   # 0.0 to 1.0 (wide to tele)
+    __slots__ = ('pan', 'tilt', 'zoom')
+    
+    def __init__(self, pan: float = 0.0, tilt: float = 0.0, zoom: float = 0.0):
+        self.pan = pan      # -1.0 to 1.0 (left to right)
+        self.tilt = tilt    # -1.0 to 1.0 (down to up)
+        self.zoom = zoom    # 0.0 to 1.0 (wide to tele)
+    
+    def __repr__(self):
+        return f"PTZState(pan={self.pan!r}, tilt={self.tilt!r}, zoom={self.zoom!r})"
+    
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.pan, self.tilt, self.zoom) == (other.pan, other.tilt, other.zoom)
 
 
-@dataclass
 class PTZVelocity:
     """Current PTZ movement velocity"""
-    pan_speed: float = 0.0   # -1.0 to 1.0
-    tilt_speed: float = 0.0  # -1.0 to 1.0
-    zoom_speed: float = 0.0  # -1.0 to 1.0
+    __slots__ = ('pan_speed', 'tilt_speed', 'zoom_speed')
+    
+    def __init__(self, pan_speed: float = 0.0, tilt_speed: float = 0.0,
+                 zoom_speed: float = 0.0):
+        self.pan_speed = pan_speed    # -1.0 to 1.0
+        self.tilt_speed = tilt_speed  # -1.0 to 1.0
+        self.zoom_speed = zoom_speed  # -1.0 to 1.0
+    
+    def __repr__(self):
+        return (f"PTZVelocity(pan_speed={self.pan_speed!r}, "
+                f"tilt_speed={self.tilt_speed!r}, zoom_speed={self.zoom_speed!r})")
+    
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return ((self.pan_speed, self.tilt_speed, self.zoom_speed) ==
+                (other.pan_speed, other.tilt_speed, other.zoom_speed))
 
 
 @dataclass
@@ -125,7 +171,10 @@ class PTZController:
     """
     
     def __init__(self, output_width: int = 1920, output_height: int = 1080, 
-                 max_zoom: float = 4.0, enable_digital_ptz: bool = True):
+                 max_zoom: float = 4.0, enable_digital_ptz: bool = True,
+                 resize_quality: str = 'auto', use_opencl: bool = False,
+                 subpixel: bool = False,
+                 presets_file: str = "ptz_presets.json"):
         """
         Initialize the PTZ controller.
         
@@ -135,26 +184,67 @@ class PTZController:
             max_zoom: Maximum zoom factor (e.g., 4.0 = 4x zoom)
             enable_digital_ptz: Whether to apply digital PTZ transforms to frames.
                                Set to False if using only hardware PTZ.
+            resize_quality: Interpolation used when scaling the crop to the
+                            output size: 'auto', 'quality' or 'fast'
+                            (see RESIZE_QUALITY_MODES).
+            use_opencl: Resample through OpenCV's OpenCL (T-API) path when an
+                        OpenCL device is available, e.g. an integrated GPU.
+                        Ignored when OpenCL is unavailable. OpenCV's global
+                        cv2.ocl.setUseOpenCL() switch is left untouched.
+            subpixel: Position the crop with sub-pixel precision (via
+                      cv2.warpAffine) instead of snapping it to whole pixels.
+                      Smoother continuous moves, but slower per frame.
+            presets_file: JSON file presets are loaded from and saved to.
         """
+        if resize_quality not in RESIZE_QUALITY_MODES:
+            raise ValueError(f"Unknown resize_quality: {resize_quality!r}")
         self.output_width = output_width
         self.output_height = output_height
-        self.max_zoom = max_zoom
+        self.max_zoom = max_zoom  # also sets _zoom_range
         self.enable_digital_ptz = enable_digital_ptz
+        self.resize_quality = resize_quality
+        self._interp_down, self._interp_up = RESIZE_QUALITY_MODES[resize_quality]
+        self.use_opencl = bool(use_opencl) and cv2.ocl.haveOpenCL()
+        self.subpixel = subpixel
         
         self.state = PTZState()
         self.velocity = PTZVelocity()
         self.presets: Dict[str, PTZPreset] = {}
+        self.presets_file = presets_file
+        
+        # Reused apply_ptz resize target (allocated on first use, see apply_ptz)
+        self._out_buf: Optional[np.ndarray] = None
+        # Last crop rectangle as ((state, src_w, src_h, zoom_range), rect)
+        self._crop_cache: Optional[tuple] = None
+        # Same, for the subpixel inverse affine matrix
+        self._affine_cache: Optional[tuple] = None
+        # Last frame layout (strides, channel shape) seen by apply_ptz and
+        # whether its pixels are packed (see _check_layout)
+        self._layout: Optional[tuple] = None
+        self._layout_ok = True
         
+        # Snapshot of (pan, tilt, zoom) for lock-free readers such as
+        # apply_ptz; rebinding a tuple is atomic, so readers never see a
+        # half-updated position. Refreshed by _publish_state().
+        self._state_tuple = (0.0, 0.0, 0.0)
         # Fast check flag - True when PTZ is at default position (no transform needed)
         self._is_default = True
         self.wrap_pan = False
         
         self._lock = threading.Lock()
+        # Set whenever a velocity may have become non-zero (see _movement_loop)
+        self._motion_event = threading.Event()
         self._movement_thread: Optional[threading.Thread] = None
         self._movement_running = False
         
         # Hardware handlers for external PTZ control
         self._hardware_handlers: List[PTZHardwareHandler] = []
+        # (filepath, payload) of the last preset file written by _save_presets
+        self._last_saved_presets: Optional[tuple] = None
+        # Pending debounced preset save (see _schedule_preset_save)
+        self._save_lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        self._presets_dirty = False
         
         # Load presets from file
         self._load_presets()
@@ -162,6 +252,17 @@ class PTZController:
         # Start movement thread
         self._start_movement_thread()
     
+    @property
+    def max_zoom(self) -> float:
+        """Maximum zoom factor (e.g., 4.0 = 4x zoom)"""
+        return self._max_zoom
+    
+    @max_zoom.setter
+    def max_zoom(self, value: float):
+        self._max_zoom = value
+        # Zoom-to-scale slope used by _compute_crop_rect
+        self._zoom_range = value - 1.0
+    
     # === Hardware Handler Management ===
     
     def add_hardware_handler(self, handler: PTZHardwareHandler) -> None:
@@ -224,8 +325,10 @@ class PTZController:
     def stop(self):
         """Stop the PTZ controller"""
         self._movement_running = False
+        self._motion_event.set()  # wake the loop if it is parked idle
         if self._movement_thread:
             self._movement_thread.join(timeout=1.0)
+        self._flush_presets()
     
     def apply_ptz(self, frame: np.ndarray) -> np.ndarray:
         """
@@ -235,7 +338,10 @@ class PTZController:
             frame: Input BGR frame (should be at least output_width x output_height)
         
         Returns:
-            Transformed frame at output_width x output_height
+            Transformed frame at output_width x output_height. When the crop
+            has to be resampled, the result is written into a buffer owned by
+            the controller and reused on the next call, so consume (or copy)
+            it before calling apply_ptz again.
         """
         # Skip digital PTZ if disabled (hardware-only mode)
         if not self.enable_digital_ptz:
@@ -245,15 +351,112 @@ class PTZController:
         if self._is_default:
             return frame
         
-        # Read current state (lock-free, small race acceptable)
-        pan = self.state.pan
-        tilt = self.state.tilt
-        zoom = self.state.zoom
+        # Sources keep one layout for the whole session, so the packing
+        # check runs once per layout rather than per frame.
+        layout = (frame.strides, frame.shape[2:])
+        if layout != self._layout:
+            self._layout_ok = self._check_layout(frame)
+            self._layout = layout
+        if not self._layout_ok:
+            frame = np.ascontiguousarray(frame)
         
+        # Read current state (lock-free, consistent snapshot)
+        state = self._state_tuple
         src_h, src_w = frame.shape[:2]
         
+        # The crop rectangle only depends on the PTZ state and the source
+        # size, which change far less often than frames arrive.
+        key = (state, src_w, src_h, self._zoom_range)
+        if self.subpixel:
+            return self._apply_subpixel(frame, key)
+        cached = self._crop_cache
+        if cached is not None and cached[0] == key:
+            x1, y1, x2, y2 = cached[1]
+        else:
+            x1, y1, x2, y2 = rect = self._compute_crop_rect(*state, src_w, src_h)
+            self._crop_cache = (key, rect)
+        
+        out_w = x2 - x1
+        out_h = y2 - y1
+        
+        # Crop already matches the output size: no resampling needed at all.
+        # Hand back the frame itself when the crop covers it, else the view
+        # (cheaper than copying it into _out_buf; stream() copies later).
+        if out_w == self.output_width and out_h == self.output_height:
+            if out_w == src_w and out_h == src_h:
+                return frame
+            return frame[y1:y2, x1:x2]
+        
+        # Shrinking (low zoom on a larger-than-output source) averages blocks
+        # with INTER_AREA, which is both faster at big ratios and alias-free;
+        # enlarging interpolates. The crop is a view, so resize reads straight
+        # from the source frame. For integer ratios (e.g. 4K -> 1080p)
+        # OpenCV's INTER_AREA takes a dedicated SIMD block-average path, so
+        # there is nothing to gain from a hand-written kernel here. Slicing
+        # copies nothing, so crop + resize is already a single pass; a fused
+        # cv2.warpAffine is several times slower than cv2.resize at 1080p.
+        if out_w > self.output_width or out_h > self.output_height:
+            interp = self._interp_down
+        else:
+            interp = self._interp_up
+        if self.use_opencl:
+            # Upload the crop, resample on the OpenCL device, download.
+            crop = cv2.UMat(frame[y1:y2, x1:x2])  # type: ignore[call-overload]
+            resized = cv2.resize(crop, (self.output_width, self.output_height),
+                                 interpolation=interp)
+            return resized.get()
+        return cv2.resize(frame[y1:y2, x1:x2], (self.output_width, self.output_height),
+                          dst=self._output_buffer(frame), interpolation=interp)
+    
+    @staticmethod
+    def _check_layout(frame: np.ndarray) -> bool:
+        """Return True if each row of frame is packed pixels.
+        
+        Row padding (e.g. an ROI view) is fine, as cv2 honours the row
+        step; strided columns or channels are not and would make cv2 copy
+        the frame on every call, so those get one explicit copy instead.
+        """
+        itemsize = frame.itemsize
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        ok = (frame.strides[1] == channels * itemsize and
+              (frame.ndim == 2 or frame.strides[2] == itemsize))
+        if not ok:
+            logger.warning(f"apply_ptz: non-packed frame layout {frame.strides}, "
+                           f"copying frames to contiguous memory")
+        return ok
+    
+    def _output_buffer(self, frame: np.ndarray) -> np.ndarray:
+        """Return the reused output buffer, reallocating it if the layout changed."""
+        out_shape = (self.output_height, self.output_width) + frame.shape[2:]
+        out = self._out_buf
+        if out is None or out.shape != out_shape or out.dtype != frame.dtype:
+            out = self._out_buf = np.empty(out_shape, dtype=frame.dtype)
+        return out
+    
+    def _apply_subpixel(self, frame: np.ndarray, key: tuple) -> np.ndarray:
+        """Sample the crop for key with sub-pixel placement via warpAffine."""
+        # The matrix also bakes in the output scale, and IPCamera can resize
+        # the output at runtime, so the output size is part of the key.
+        key = key + (self.output_width, self.output_height)
+        cached = self._affine_cache
+        if cached is not None and cached[0] == key:
+            matrix = cached[1]
+        else:
+            (pan, tilt, zoom), src_w, src_h = key[:3]
+            matrix = self._compute_affine(pan, tilt, zoom, src_w, src_h)
+            self._affine_cache = (key, matrix)
+        # warpAffine has no block-averaging mode, so always use the
+        # interpolating filter of the selected quality.
+        return cv2.warpAffine(frame, matrix, (self.output_width, self.output_height),
+                              dst=self._output_buffer(frame),
+                              flags=cv2.WARP_INVERSE_MAP | self._interp_up,
+                              borderMode=cv2.BORDER_REPLICATE)
+    
+    def _compute_crop_rect(self, pan: float, tilt: float, zoom: float,
+                           src_w: int, src_h: int) -> tuple:
+        """Return the (x1, y1, x2, y2) source crop for a PTZ position."""
         # Calculate crop size based on zoom level
-        zoom_factor = 1.0 + zoom * (self.max_zoom - 1.0)
+        zoom_factor = 1.0 + zoom * self._zoom_range
         crop_w = int(src_w / zoom_factor)
         crop_h = int(src_h / zoom_factor)
         
@@ -262,76 +465,122 @@ class PTZController:
         crop_h = min(crop_h, src_h)
         
         # Calculate max offset (how far we can pan/tilt)
-        max_offset_x = (src_w - crop_w) // 2
-        max_offset_y = (src_h - crop_h) // 2
+        max_offset_x = (src_w - crop_w) >> 1
+        max_offset_y = (src_h - crop_h) >> 1
         
         # Calculate crop center position
-        center_x = src_w // 2 + int(pan * max_offset_x)
-        center_y = src_h // 2 - int(tilt * max_offset_y)
+        center_x = (src_w >> 1) + int(pan * max_offset_x)
+        center_y = (src_h >> 1) - int(tilt * max_offset_y)
         
         # Calculate crop boundaries
-        x1 = max(0, center_x - crop_w // 2)
-        y1 = max(0, center_y - crop_h // 2)
+        x1 = max(0, center_x - (crop_w >> 1))
+        y1 = max(0, center_y - (crop_h >> 1))
         x2 = min(src_w, x1 + crop_w)
         y2 = min(src_h, y1 + crop_h)
+        return x1, y1, x2, y2
+    
+    def _compute_affine(self, pan: float, tilt: float, zoom: float,
+                        src_w: int, src_h: int) -> np.ndarray:
+        """Return the output-to-source affine matrix for a PTZ position.
+        
+        Unlike _compute_crop_rect, the crop origin is kept fractional.
+        """
+        zoom_factor = 1.0 + zoom * self._zoom_range
+        crop_w = min(src_w / zoom_factor, src_w)
+        crop_h = min(src_h / zoom_factor, src_h)
         
-        # Crop and resize
-        cropped = frame[y1:y2, x1:x2]
+        # Crop center, then its top-left corner clamped inside the source
+        cx = src_w * 0.5 + pan * (src_w - crop_w) * 0.5
+        cy = src_h * 0.5 - tilt * (src_h - crop_h) * 0.5
+        x1 = min(max(cx - crop_w * 0.5, 0.0), src_w - crop_w)
+        y1 = min(max(cy - crop_h * 0.5, 0.0), src_h - crop_h)
         
-        # Only resize if necessary
-        if cropped.shape[1] != self.output_width or cropped.shape[0] != self.output_height:
-            output = cv2.resize(cropped, (self.output_width, self.output_height), 
-                               interpolation=cv2.INTER_LINEAR)
-        else:
-            output = cropped
+        # Map output pixel centers onto the crop
+        sx = crop_w / self.output_width
+        sy = crop_h / self.output_height
+        return np.array([[sx, 0.0, x1 + 0.5 * sx - 0.5],
+                         [0.0, sy, y1 + 0.5 * sy - 0.5]], dtype=np.float64)
+    
+    def _clamp_position(self, pan: float, tilt: float, zoom: float) -> tuple:
+        """Clamp a (pan, tilt, zoom) position to the valid PTZ ranges.
         
-        return output
+        Pan is left unclamped when wrap_pan is set.
+        """
+        if not self.wrap_pan:
+            pan = max(-1.0, min(1.0, pan))
+        return pan, max(-1.0, min(1.0, tilt)), max(0.0, min(1.0, zoom))
+    
+    def _clear_velocity(self):
+        """Zero the velocity in place. Call with self._lock held."""
+        velocity = self.velocity
+        velocity.pan_speed = velocity.tilt_speed = velocity.zoom_speed = 0.0
+    
+    def _publish_state(self):
+        """Refresh the lock-free state snapshot. Call with self._lock held."""
+        pan, tilt, zoom = self.state.pan, self.state.tilt, self.state.zoom
+        self._state_tuple = (pan, tilt, zoom)
+        self._is_default = (abs(pan) < 0.001 and 
+                            abs(tilt) < 0.001 and 
+                            abs(zoom) < 0.001)
     
     def _movement_loop(self):
         """Background thread for continuous movement"""
-        last_time = time.time()
+        # Monotonic clock: wall-clock (NTP) jumps must not turn into a jump
+        # in the integrated position. Ticks are scheduled against a deadline
+        # so the time spent integrating doesn't stretch the period.
+        #
+        # The tick body only touches locals: state and velocity are mutated
+        # in place everywhere (never rebound), so they can be bound once.
+        state = self.state
+        velocity = self.velocity
+        lock = self._lock
+        motion_event = self._motion_event
+        clamp = self._clamp_position
+        publish = self._publish_state
+        monotonic_ns = time.monotonic_ns
+        speed_factor = 1.0  # Units per second at full speed
+        
+        last_ns = monotonic_ns()
+        next_tick_ns = last_ns
         
         while self._movement_running:
-            current_time = time.time()
-            dt = current_time - last_time
-            last_time = current_time
+            now_ns = monotonic_ns()
+            dt = (now_ns - last_ns) / 1e9
+            last_ns = now_ns
             
             # Quick check for movement without lock (small race acceptable)
-            has_movement = (abs(self.velocity.pan_speed) >= 0.001 or 
-                           abs(self.velocity.tilt_speed) >= 0.001 or
-                           abs(self.velocity.zoom_speed) >= 0.001)
+            has_movement = (abs(velocity.pan_speed) >= 0.001 or 
+                           abs(velocity.tilt_speed) >= 0.001 or
+                           abs(velocity.zoom_speed) >= 0.001)
             
             if not has_movement:
-                time.sleep(0.05)  # Sleep longer when idle
+                # Park until continuous_move() (or stop()) signals; a fixed
+                # camera then costs no wakeups at all. Clearing before the
+                # velocity is re-checked means a signal can't be lost.
+                motion_event.wait()
+                motion_event.clear()
+                last_ns = next_tick_ns = monotonic_ns()
                 continue
             
             # Only acquire lock when actually updating position
-            with self._lock:
-                # Apply velocity to position
-                speed_factor = 1.0  # Units per second at full speed
-                
-                self.state.pan += self.velocity.pan_speed * speed_factor * dt
-                self.state.tilt += self.velocity.tilt_speed * speed_factor * dt
-                self.state.zoom += self.velocity.zoom_speed * speed_factor * dt
-                
-                # Clamp values
-                # if self.wrap_pan:
-                #     if self.state.pan < -1.0:
-                #         self.state.pan += 2.0
-                #     elif self.state.pan > 1.0:
-                #         self.state.pan -= 2.0
-                if not self.wrap_pan:
-                    self.state.pan = max(-1.0, min(1.0, self.state.pan))
-                    
-                self.state.tilt = max(-1.0, min(1.0, self.state.tilt))
-                self.state.zoom = max(0.0, min(1.0, self.state.zoom))
-                
-                # Update default flag
-                self._is_default = (abs(self.state.pan) < 0.001 and 
-                                   abs(self.state.tilt) < 0.001 and 
-                                   abs(self.state.zoom) < 0.001)
+            with lock:
+                # Integrate and clamp all three axes in one step, writing
+                # each state field exactly once.
+                step = speed_factor * dt
+                state.pan, state.tilt, state.zoom = clamp(
+                    state.pan + velocity.pan_speed * step,
+                    state.tilt + velocity.tilt_speed * step,
+                    state.zoom + velocity.zoom_speed * step)
+                publish()
             
-            time.sleep(0.016)  # ~60Hz update rate
+            next_tick_ns += MOVEMENT_PERIOD_NS
+            delay_ns = next_tick_ns - monotonic_ns()
+            if delay_ns > 0:
+                time.sleep(delay_ns / 1e9)
+            else:
+                # Fell behind (e.g. a long GIL stall): resync rather than
+                # firing a burst of catch-up ticks.
+                next_tick_ns = monotonic_ns()
     
     # === ONVIF PTZ Commands ===
     
@@ -342,6 +591,7 @@ class PTZController:
             self.velocity.pan_speed = max(-1.0, min(1.0, pan_speed))
             self.velocity.tilt_speed = max(-1.0, min(1.0, tilt_speed))
             self.velocity.zoom_speed = max(-1.0, min(1.0, zoom_speed))
+        self._motion_event.set()
         
         # Notify hardware handlers
         self._notify_hardware('on_continuous_move', pan_speed, tilt_speed, zoom_speed)
@@ -370,11 +620,8 @@ class PTZController:
             if zoom is not None:
                 self.state.zoom = max(0.0, min(1.0, zoom))
             # Stop any continuous movement
-            self.velocity = PTZVelocity()
-            # Update default flag
-            self._is_default = (abs(self.state.pan) < 0.001 and 
-                               abs(self.state.tilt) < 0.001 and 
-                               abs(self.state.zoom) < 0.001)
+            self._clear_velocity()
+            self._publish_state()
         
         # Notify hardware handlers
         self._notify_hardware('on_absolute_move', pan, tilt, zoom)
@@ -388,11 +635,8 @@ class PTZController:
             self.state.tilt = max(-1.0, min(1.0, self.state.tilt + tilt_delta))
             self.state.zoom = max(0.0, min(1.0, self.state.zoom + zoom_delta))
             # Stop any continuous movement
-            self.velocity = PTZVelocity()
-            # Update default flag
-            self._is_default = (abs(self.state.pan) < 0.001 and 
-                               abs(self.state.tilt) < 0.001 and 
-                               abs(self.state.zoom) < 0.001)
+            self._clear_velocity()
+            self._publish_state()
         
         # Notify hardware handlers
         self._notify_hardware('on_relative_move', pan_delta, tilt_delta, zoom_delta)
@@ -405,14 +649,16 @@ class PTZController:
     
     def get_status(self) -> dict:
         """Get current PTZ status"""
+        # Reads the public state rather than the _state_tuple snapshot, so
+        # direct writes to ptz.state (e.g. examples/360_ptz.py) are reported.
         with self._lock:
             return {
                 'pan': self.state.pan,
                 'tilt': self.state.tilt,
                 'zoom': self.state.zoom,
                 'moving': (abs(self.velocity.pan_speed) > 0.001 or
-                          abs(self.velocity.tilt_speed) > 0.001 or
-                          abs(self.velocity.zoom_speed) > 0.001)
+                           abs(self.velocity.tilt_speed) > 0.001 or
+                           abs(self.velocity.zoom_speed) > 0.001)
             }
     
     # === Preset Management ===
@@ -427,8 +673,11 @@ class PTZController:
                 tilt=self.state.tilt,
                 zoom=self.state.zoom
             )
-            self.presets[token] = preset
-        self._save_presets()
+            # Copy-on-write: views handed out by get_presets stay consistent
+            presets = dict(self.presets)
+            presets[token] = preset
+            self.presets = presets
+        self._schedule_preset_save()
         return token
     
     def goto_preset(self, token: str) -> bool:
@@ -440,11 +689,8 @@ class PTZController:
             self.state.pan = preset.pan
             self.state.tilt = preset.tilt
             self.state.zoom = preset.zoom
-            self.velocity = PTZVelocity()
-            # Update default flag
-            self._is_default = (abs(self.state.pan) < 0.001 and 
-                               abs(self.state.tilt) < 0.001 and 
-                               abs(self.state.zoom) < 0.001)
+            self._clear_velocity()
+            self._publish_state()
             # Save values for notification outside lock
             pan, tilt, zoom = preset.pan, preset.tilt, preset.zoom
         
@@ -455,35 +701,92 @@ class PTZController:
     def remove_preset(self, token: str) -> bool:
         """Remove a preset"""
         with self._lock:
-            if token in self.presets:
-                del self.presets[token]
-                self._save_presets()
-                return True
-        return False
+            if token not in self.presets:
+                return False
+            presets = dict(self.presets)
+            del presets[token]
+            self.presets = presets
+        self._schedule_preset_save()
+        return True
     
-    def get_presets(self) -> Dict[str, PTZPreset]:
-        """Get all presets"""
-        with self._lock:
-            return dict(self.presets)
+    def get_presets(self) -> Mapping[str, PTZPreset]:
+        """Get all presets as a read-only view.
+
+        set_preset/remove_preset replace the presets dict rather than
+        mutating it, so a view stays consistent while it is iterated.
+        """
+        return MappingProxyType(self.presets)
     
-    def _load_presets(self, filepath: str = "ptz_presets.json"):
-        """Load presets from file"""
+    def _load_presets(self, filepath: Optional[str] = None):
+        """Load presets from file (default: presets_file)"""
+        if filepath is None:
+            filepath = self.presets_file
         try:
             with open(filepath, 'r') as f:
                 data = json.load(f)
+            presets = dict(self.presets)
             for token, preset_data in data.items():
-                self.presets[token] = PTZPreset(**preset_data)
+                presets[token] = PTZPreset(**preset_data)
+            self.presets = presets
         except FileNotFoundError:
             # Create default home preset
-            self.presets['home'] = PTZPreset('home', 'Home', 0.0, 0.0, 0.0)
+            self.presets = {**self.presets, 'home': PTZPreset('home', 'Home', 0.0, 0.0, 0.0)}
         except Exception as e:
             logger.error(f"Failed to load presets: {e}")
     
-    def _save_presets(self, filepath: str = "ptz_presets.json"):
-        """Save presets to file"""
+    def _schedule_preset_save(self):
+        """Mark presets dirty and (re)start the debounced save timer."""
+        with self._save_lock:
+            self._presets_dirty = True
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(PRESET_SAVE_DELAY, self._flush_presets)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+    
+    def _flush_presets(self):
+        """Write presets now if a debounced save is pending."""
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._presets_dirty:
+                return
+            self._presets_dirty = False
+        self._save_presets()
+    
+    def _save_presets(self, filepath: Optional[str] = None):
+        """Save presets to file atomically, skipping unchanged payloads.
+        
+        Writes to presets_file unless filepath is given.
+        """
+        if filepath is None:
+            filepath = self.presets_file
+        tmp_path = None
         try:
-            data = {token: asdict(preset) for token, preset in self.presets.items()}
-            with open(filepath, 'w') as f:
-                json.dump(data, f, indent=2)
+            with self._lock:
+                data = {
+                    token: {'token': p.token, 'name': p.name,
+                            'pan': p.pan, 'tilt': p.tilt, 'zoom': p.zoom}
+                    for token, p in self.presets.items()
+                }
+            payload = json.dumps(data, separators=(',', ':'))
+            if self._last_saved_presets == (filepath, payload):
+                return
+            target_dir = os.path.dirname(os.path.abspath(filepath))
+            fd, tmp_path = tempfile.mkstemp(
+                dir=target_dir, prefix='.ptz_presets_', suffix='.tmp'
+            )
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, filepath)
+            self._last_saved_presets = (filepath, payload)
         except Exception as e:
             logger.error(f"Failed to save presets: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
@@ -6,20 +6,39 @@ A clean, reusable video streamer that accepts frames from any source
 and pushes them to an RTMP endpoint (e.g., go2rtc) for RTSP redistribution.
 """
 
+import os
 import subprocess
+import sys
 import time
 import logging
 import threading
+import cv2
 import numpy as np
-from typing import Optional, Tuple, Deque
+from typing import Any, Dict, Optional, Tuple, Deque
 from dataclasses import dataclass, field
 from enum import Enum
 from collections import deque
 
 from .framequeue import FrameQueue
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
 logger = logging.getLogger(__name__)
 
+# Linux only: grow FFmpeg's stdin pipe from the 64 KiB default so a raw frame
+# goes through in a few large write(2) calls instead of one wake-up per 64 KiB.
+# 1 MiB is the default unprivileged limit (/proc/sys/fs/pipe-max-size).
+_STDIN_PIPE_SIZE = 1 << 20
+# fcntl exports F_SETPIPE_SZ from Python 3.10; 1031 is its Linux value.
+_F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+
+# FFmpeg stderr is drained continuously by a reader thread into a ring of
+# the most recent lines, used for error detection and dumps.
+_STDERR_RING_LINES = 100
+
 
 class HWAccel(Enum):
     AUTO = "auto"
@@ -41,6 +60,11 @@ class StreamConfig:
     sub_width: int = 640
     sub_height: int = 480
     sub_bitrate: str = "1M"
+    # Optional FFmpeg scheduling (Linux/POSIX, best effort): CPU cores to pin
+    # the encoder process to, e.g. away from the capture thread, and its
+    # niceness (negative values need CAP_SYS_NICE/root).
+    ffmpeg_cpus: Optional[Tuple[int, ...]] = None
+    ffmpeg_nice: Optional[int] = None
     
     def __post_init__(self):
         if self.keyframe_interval is None:
@@ -49,10 +73,14 @@ class StreamConfig:
 
 @dataclass
 class StreamStats:
-    """Statistics for the current stream with sliding window FPS calculation"""
+    """Statistics for the current stream with sliding window FPS calculation
+
+    All times are ``time.monotonic()`` seconds: cheap to read every frame and
+    immune to wall-clock (NTP/DST) jumps skewing the FPS and bitrate figures.
+    """
     frames_sent: int = 0
     bytes_sent: int = 0
-    start_time: float = field(default_factory=time.time)
+    start_time: float = field(default_factory=time.monotonic)
     last_frame_time: float = 0
     dropped_frames: int = 0
     # Sliding window for FPS calculation (stores timestamps)
@@ -61,7 +89,7 @@ class StreamStats:
     
     @property
     def elapsed_time(self) -> float:
-        return time.time() - self.start_time
+        return time.monotonic() - self.start_time
     
     @property
     def actual_fps(self) -> float:
@@ -69,7 +97,7 @@ class StreamStats:
         if len(self._frame_timestamps) < 2:
             return 0
         
-        current_time = time.time()
+        current_time = time.monotonic()
         # Find frames within the window
         cutoff_time = current_time - self._window_seconds
         
@@ -117,6 +145,10 @@ class VideoStreamer:
     RECONNECT_CHECK_TIMEOUT = 2.0     # passed to _check_ffmpeg_running()
     RECONNECT_WARMUP_TIMEOUT = 5.0    # passed to _warm_up_encoder()
 
+    # The writer flushes FFmpeg's stdin on the first frame and then every
+    # FLUSH_INTERVAL frames, to bound latency.
+    FLUSH_INTERVAL = 15
+
     def __init__(self, config: Optional[StreamConfig] = None):
         """
         Initialize the streamer with optional configuration.
@@ -128,12 +160,11 @@ class VideoStreamer:
         self.config = config or StreamConfig()
         self._ffmpeg_process: Optional[subprocess.Popen] = None
         self._is_running = False
-        self._lock = threading.Lock()
         self.stats = StreamStats()
         self._active_hw_accel: Optional[str] = None
         self._rtmp_url: Optional[str] = None
         self._rtmp_url_sub: Optional[str] = None
-        self._ffmpeg_stderr_buffer = []
+        self._ffmpeg_stderr_buffer: Deque[bytes] = deque(maxlen=_STDERR_RING_LINES)
         self._stderr_thread: Optional[threading.Thread] = None
 
         # Frames are handed to a dedicated writer thread through this bounded,
@@ -175,9 +206,24 @@ class VideoStreamer:
         """Return expected frame size as (width, height)"""
         return (self.config.width, self.config.height)
     
+    @property
+    def input_pix_fmt(self) -> str:
+        """Raw pixel format written to FFmpeg's stdin.
+
+        Planar YUV 4:2:0 is what the encoders consume and is half the size of
+        BGR24, so frames are converted on the writer thread and FFmpeg skips
+        its own per-frame colour conversion. 4:2:0 needs even dimensions;
+        odd-sized streams fall back to BGR24.
+        """
+        if self.config.width % 2 == 0 and self.config.height % 2 == 0:
+            return "yuv420p"
+        return "bgr24"
+
     @property
     def expected_frame_bytes(self) -> int:
-        """Return expected number of bytes per frame (BGR24)"""
+        """Return expected number of bytes per frame (in input_pix_fmt)"""
+        if self.input_pix_fmt == "yuv420p":
+            return self.config.width * self.config.height * 3 // 2
         return self.config.width * self.config.height * 3
     
     def start(self, rtmp_url: str, rtmp_url_sub: Optional[str] = None) -> bool:
@@ -239,7 +285,7 @@ class VideoStreamer:
             try:
                 logger.info(f"Starting with {hw_type.value.upper()}...")
                 # Reset stderr buffer for this attempt
-                self._ffmpeg_stderr_buffer = []
+                self._ffmpeg_stderr_buffer = deque(maxlen=_STDERR_RING_LINES)
 
                 self._start_ffmpeg(rtmp_url, rtmp_url_sub, hw_type)
                 if self._check_ffmpeg_running():
@@ -344,43 +390,63 @@ class VideoStreamer:
     def _write_loop(self):
         """Writer thread: resize/convert each queued frame and write to FFmpeg.
 
-        All the heavy/blocking work (resize, tobytes, stdin.write) lives here so
-        the capture thread stays free. A full OS pipe buffer only blocks THIS
-        thread; the bounded queue drops stale frames in the meantime.
+        All the heavy/blocking work (resize, colour conversion, stdin.write)
+        lives here so the capture thread stays free. A full OS pipe buffer only
+        blocks THIS thread; the bounded queue drops stale frames meanwhile.
         """
-        import cv2
+        size = width, height = self.frame_size
+        # Scratch buffer the colour conversion writes into: the write below
+        # is synchronous on this thread, so one buffer is reused every frame.
+        yuv_buf = (np.empty((height * 3 // 2, width), dtype=np.uint8)
+                   if self.input_pix_fmt == "yuv420p" else None)
+        # Frames left until the next flush (a countdown, not a per-frame modulo)
+        flush_countdown = 1
         while self._writer_running:
             frame = self._frame_queue.get(timeout=0.5)
             if frame is None:
                 continue
 
             try:
-                # Resize if needed
-                if frame.shape[1] != self.config.width or frame.shape[0] != self.config.height:
-                    frame = cv2.resize(frame, (self.config.width, self.config.height))
+                # Resize if needed. INTER_AREA is the cheaper, alias-free
+                # box filter for shrinking; bilinear is kept for upscaling.
+                if frame.shape[1] != width or frame.shape[0] != height:
+                    interpolation = cv2.INTER_AREA if frame.shape[1] > width else cv2.INTER_LINEAR
+                    frame = cv2.resize(frame, size, interpolation=interpolation)
 
                 # Ensure BGR24 format
                 if len(frame.shape) == 2:  # Grayscale
                     frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
                 elif frame.shape[2] == 4:  # BGRA
-                    frame = frame[:, :, :3]
-
-                frame_bytes = frame.tobytes()
-
-                with self._lock:
-                    if self._ffmpeg_process and self._ffmpeg_process.stdin:
-                        self._ffmpeg_process.stdin.write(frame_bytes)
-
-                        # Periodic flush for low latency
-                        if self.stats.frames_sent % 15 == 0:
-                            self._ffmpeg_process.stdin.flush()
-
-                # Update stats
-                current_time = time.time()
-                self.stats.frames_sent += 1
-                self.stats.bytes_sent += len(frame_bytes)
-                self.stats.last_frame_time = current_time
-                self.stats.record_frame(current_time)
+                    # One packed SIMD pass; slicing [:, :, :3] leaves a
+                    # strided view that has to be gathered again later.
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+
+                # Write straight from the array's buffer; tobytes() would
+                # copy the whole frame first.
+                data = self._to_input_format(frame, yuv_buf)
+                if not data.flags['C_CONTIGUOUS']:
+                    data = np.ascontiguousarray(data)
+                frame_bytes = memoryview(data).cast('B')
+
+                # Only this thread writes to (or, via _reconnect, replaces)
+                # the process while the writer runs, so no lock is needed.
+                process = self._ffmpeg_process
+                if process and process.stdin:
+                    process.stdin.write(frame_bytes)
+
+                    # Periodic flush for low latency
+                    flush_countdown -= 1
+                    if not flush_countdown:
+                        process.stdin.flush()
+                        flush_countdown = self.FLUSH_INTERVAL
+
+                # Update stats (bound once: start() may swap in a new object)
+                stats = self.stats
+                current_time = time.monotonic()
+                stats.frames_sent += 1
+                stats.bytes_sent += frame_bytes.nbytes
+                stats.last_frame_time = current_time
+                stats.record_frame(current_time)
 
             except BrokenPipeError:
                 logger.warning("FFmpeg pipe broken")
@@ -398,13 +464,23 @@ class VideoStreamer:
                 self._dump_ffmpeg_error()
                 self.stats.dropped_frames += 1
 
+    def _to_input_format(self, frame: np.ndarray, dst: Optional[np.ndarray] = None) -> np.ndarray:
+        """Convert a configured-size BGR frame to input_pix_fmt.
+
+        If given, ``dst`` is a preallocated (height * 3 // 2, width) uint8
+        buffer the YUV planes are written into instead of a new array.
+        """
+        if self.input_pix_fmt == "yuv420p":
+            # BT.601 limited range, the same conversion FFmpeg would apply
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420, dst=dst)
+        return frame
+
     def _reconnect(self) -> bool:
         """Attempt a bounded, backed-off restart of FFmpeg after the writer
         thread observes the process/pipe has died.
 
         Runs synchronously ON THE WRITER THREAD (the only thread that ever
-        writes to stdin), so there is no lock held across the restart -- the
-        per-frame lock in _write_loop only ever guards a single stdin.write.
+        writes to stdin), so the restart never races a frame write.
         Reads/writes of ``self._ffmpeg_process`` here are plain attribute
         assignments (pointer swaps), which is all that's needed since the only
         other readers (``is_running``, ``stream()``) just check identity/None,
@@ -441,7 +517,7 @@ class VideoStreamer:
 
             try:
                 hw_type = HWAccel(self._active_hw_accel) if self._active_hw_accel else HWAccel.CPU
-                self._ffmpeg_stderr_buffer = []
+                self._ffmpeg_stderr_buffer = deque(maxlen=_STDERR_RING_LINES)
                 self._start_ffmpeg(self._rtmp_url, self._rtmp_url_sub, hw_type)
                 if (self._check_ffmpeg_running(timeout=self.RECONNECT_CHECK_TIMEOUT)
                         and self._warm_up_encoder(timeout=self.RECONNECT_WARMUP_TIMEOUT)):
@@ -488,16 +564,25 @@ class VideoStreamer:
     def _start_ffmpeg(self, rtmp_url: str, rtmp_url_sub: Optional[str], hw_type: HWAccel):
         """Start FFmpeg with the specified hardware acceleration"""
         
-        hw_configs = {
+        hw_configs: Dict[HWAccel, Dict[str, Any]] = {
             HWAccel.NVENC: {
                 "codec": "h264_nvenc",
                 "extra_input": [],
                 "extra_encode": [
                     "-gpu", "0",
                     "-preset", "p1",
+                    "-tune", "ull",           # ultra-low-latency
                     "-rc", "cbr",
+                    "-zerolatency", "1",      # no reordering delay
+                    "-delay", "0",            # emit packets as soon as encoded
+                    "-rc-lookahead", "0",
                     "-bf", "0",
                 ],
+                # With a substream: upload each frame once, split it in VRAM
+                # and scale the substream copy there, so both encoders read
+                # GPU frames instead of a CPU swscale + second upload.
+                "hw_device": ["-init_hw_device", "cuda=cu:0", "-filter_hw_device", "cu"],
+                "sub_filter": "hwupload_cuda,split=2[main][sub];[sub]scale_cuda={w}:{h}[subs]",
             },
             HWAccel.QSV: {
                 "codec": "h264_qsv",
@@ -508,6 +593,11 @@ class VideoStreamer:
                     "-look_ahead", "0",
                     "-bf", "0",
                 ],
+                # Same upload-once/split/scale-on-GPU substream path as NVENC.
+                # The QSV frames context takes NV12, not planar yuv420p.
+                "hw_device": ["-init_hw_device", "qsv=hw", "-filter_hw_device", "hw"],
+                "sub_filter": "format=nv12,hwupload=extra_hw_frames=16,split=2[main][sub];"
+                              "[sub]vpp_qsv=w={w}:h={h}[subs]",
             },
             HWAccel.CPU: {
                 "codec": "libx264",
@@ -522,27 +612,50 @@ class VideoStreamer:
         }
         
         config = hw_configs[hw_type]
-        
+
+        # A substream identical to the main stream (same size and bitrate) is
+        # encoded once and its packets fanned out to both URLs by the tee
+        # muxer, instead of running a second, identical encoder.
+        tee_sub = bool(rtmp_url_sub) and (
+            (self.config.sub_width, self.config.sub_height, self.config.sub_bitrate)
+            == (self.config.width, self.config.height, self.config.bitrate))
+
+        # GPU-side substream scaling needs a planar input the upload accepts
+        sub_filter = None
+        if (rtmp_url_sub and not tee_sub and "sub_filter" in config
+                and self.input_pix_fmt == "yuv420p"):
+            sub_filter = config["sub_filter"].format(
+                w=self.config.sub_width, h=self.config.sub_height)
+        # Hardware frames are already in the encoder's format; forcing
+        # -pix_fmt would insert a software conversion the filter can't feed.
+        encode_pix_fmt = [] if sub_filter else ["-pix_fmt", "yuv420p"]
+
         # Build FFmpeg command
         cmd = [
             "ffmpeg",
+            # Keep stderr quiet in steady state (no banner, stream dump or
+            # per-second progress line). Warnings are kept: some of the
+            # failure patterns checked below are logged at that level.
+            "-hide_banner", "-nostats", "-loglevel", "warning",
             "-y",
             "-f", "rawvideo",
             "-vcodec", "rawvideo",
             "-s", f"{self.config.width}x{self.config.height}",
-            "-pix_fmt", "bgr24",
+            "-pix_fmt", self.input_pix_fmt,
             "-r", str(self.config.fps),
         ]
         
         # Hardware-specific input args
         cmd.extend(config["extra_input"])
+        if sub_filter:
+            cmd.extend(config["hw_device"])
         cmd.extend(["-i", "-"])
-        
+        if sub_filter:
+            cmd.extend(["-filter_complex", sub_filter, "-map", "[main]"])
+
         # Encoding settings
-        cmd.extend([
-            "-c:v", config["codec"],
-            "-pix_fmt", "yuv420p",
-        ])
+        cmd.extend(["-c:v", config["codec"]])
+        cmd.extend(encode_pix_fmt)
         cmd.extend(config["extra_encode"])
         
         # Common output settings
@@ -555,7 +668,15 @@ class VideoStreamer:
             "-fflags", "+genpts+flush_packets",
         ])
 
-        if rtmp_url.startswith("rtsp://"):
+        if tee_sub:
+            assert rtmp_url_sub is not None  # tee_sub implies a sub URL
+            cmd.extend([
+                "-flags", "+global_header",
+                "-map", "0:v",
+                "-f", "tee",
+                f"{self._tee_slave(rtmp_url)}|{self._tee_slave(rtmp_url_sub)}",
+            ])
+        elif rtmp_url.startswith("rtsp://"):
              cmd.extend([
                 "-f", "rtsp",
                 "-rtsp_transport", "tcp",
@@ -569,15 +690,16 @@ class VideoStreamer:
             ])
         
         # Add substream output if requested
-        if rtmp_url_sub:
-            cmd.extend([
-                "-c:v", config["codec"],
-                "-pix_fmt", "yuv420p",
-            ])
+        if rtmp_url_sub and not tee_sub:
+            if sub_filter:
+                cmd.extend(["-map", "[subs]"])
+            cmd.extend(["-c:v", config["codec"]])
+            cmd.extend(encode_pix_fmt)
             cmd.extend(config["extra_encode"])
-            
+
+            if not sub_filter:
+                cmd.extend(["-s", f"{self.config.sub_width}x{self.config.sub_height}"])
             cmd.extend([
-                "-s", f"{self.config.sub_width}x{self.config.sub_height}",
                 "-b:v", self.config.sub_bitrate,
                 "-g", str(self.config.keyframe_interval),
             ])
@@ -607,9 +729,11 @@ class VideoStreamer:
             stderr=subprocess.PIPE,
             creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
         )
+        self._grow_stdin_pipe()
+        self._apply_ffmpeg_scheduling()
 
         # Store stderr for error checking
-        self._ffmpeg_stderr_buffer = []
+        self._ffmpeg_stderr_buffer = deque(maxlen=_STDERR_RING_LINES)
 
         def read_stderr():
             """Read stderr in background to detect errors early.
@@ -622,10 +746,8 @@ class VideoStreamer:
                 try:
                     for line in iter(self._ffmpeg_process.stderr.readline, b''):
                         if line:
+                            # Bounded ring: the oldest line falls off in O(1)
                             self._ffmpeg_stderr_buffer.append(line)
-                            # Keep buffer from growing too large
-                            if len(self._ffmpeg_stderr_buffer) > 100:
-                                self._ffmpeg_stderr_buffer.pop(0)
                 except Exception:
                     pass
 
@@ -635,12 +757,44 @@ class VideoStreamer:
         )
         self._stderr_thread.start()
     
+    @staticmethod
+    def _tee_slave(url: str) -> str:
+        """Format one tee muxer output with the muxer options for its URL."""
+        if url.startswith("rtsp://"):
+            return f"[f=rtsp:rtsp_transport=tcp]{url}"
+        return f"[f=flv]{url}"
+
+    def _grow_stdin_pipe(self):
+        """Enlarge the FFmpeg stdin pipe buffer where the OS allows it."""
+        if fcntl is None or not sys.platform.startswith("linux"):
+            return
+        try:
+            fd = self._ffmpeg_process.stdin.fileno()
+            fcntl.fcntl(fd, _F_SETPIPE_SZ, _STDIN_PIPE_SIZE)
+        except Exception as e:
+            # Best effort: the default pipe size still works
+            logger.debug(f"Could not resize FFmpeg stdin pipe: {e}")
+
+    def _apply_ffmpeg_scheduling(self):
+        """Apply the configured CPU affinity / niceness to the FFmpeg process."""
+        pid = self._ffmpeg_process.pid
+        if self.config.ffmpeg_cpus is not None:
+            try:
+                os.sched_setaffinity(pid, self.config.ffmpeg_cpus)
+            except (AttributeError, OSError, ValueError) as e:
+                logger.warning(f"Could not pin FFmpeg to CPUs {self.config.ffmpeg_cpus}: {e}")
+        if self.config.ffmpeg_nice is not None:
+            try:
+                os.setpriority(os.PRIO_PROCESS, pid, self.config.ffmpeg_nice)
+            except (AttributeError, OSError) as e:
+                logger.warning(f"Could not set FFmpeg niceness to {self.config.ffmpeg_nice}: {e}")
+
     def _warm_up_encoder(self, timeout: float = 5.0) -> bool:
         """Send test frames to verify encoder works before declaring success"""
         try:
             # Create a black test frame
             test_frame = np.zeros((self.config.height, self.config.width, 3), dtype=np.uint8)
-            frame_bytes = test_frame.tobytes()
+            frame_bytes = self._to_input_format(test_frame).tobytes()
             
             start_time = time.time()
             frames_sent = 0
@@ -741,18 +895,12 @@ class VideoStreamer:
     
     def _dump_ffmpeg_error(self):
         """Log FFmpeg stderr for debugging"""
-        if hasattr(self, '_ffmpeg_stderr_buffer') and self._ffmpeg_stderr_buffer:
+        # Only the reader thread's ring is used: reading the pipe here would
+        # race that thread and block until exit on a still-running FFmpeg.
+        if self._ffmpeg_stderr_buffer:
             stderr_text = b''.join(self._ffmpeg_stderr_buffer).decode('utf-8', errors='ignore')
             if stderr_text.strip():
                 logger.error(f"FFmpeg error output:\n{stderr_text}")
-        elif self._ffmpeg_process and self._ffmpeg_process.stderr:
-            try:
-                # Try to read remaining stderr
-                stderr = self._ffmpeg_process.stderr.read()
-                if stderr:
-                    logger.error(f"FFmpeg error output:\n{stderr.decode('utf-8', errors='ignore')}")
-            except Exception as e:
-                logger.error(f"Could not read FFmpeg stderr: {e}")
     
     def _cleanup_ffmpeg(self):
         """Clean up FFmpeg process"""
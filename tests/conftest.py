@@ -7,7 +7,7 @@ import sys
 import tempfile
 import json
 from io import BytesIO
-from unittest.mock import MagicMock
+from unittest.mock import Mock
 
 import pytest
 import numpy as np
@@ -16,7 +16,7 @@ import numpy as np
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ipycam.config import CameraConfig
-from ipycam.ptz import PTZController, PTZState, PTZVelocity, PTZPreset
+from ipycam.ptz import PTZController, PTZState, PTZVelocity, PTZPreset, PTZHardwareHandler
 
 
 @pytest.fixture
@@ -78,42 +78,71 @@ def temp_config_file(custom_config):
 
 
 @pytest.fixture
-def ptz_controller():
+def ptz_controller(tmp_path):
     """Create a PTZController for testing"""
     controller = PTZController(
         output_width=1920,
         output_height=1080,
         max_zoom=4.0,
-        enable_digital_ptz=True
+        enable_digital_ptz=True,
+        presets_file=str(tmp_path / "ptz_presets.json"),
     )
     yield controller
     controller.stop()
 
 
 @pytest.fixture
-def ptz_controller_no_digital():
+def ptz_controller_no_digital(tmp_path):
     """Create a PTZController with digital PTZ disabled"""
     controller = PTZController(
         output_width=1920,
         output_height=1080,
         max_zoom=4.0,
-        enable_digital_ptz=False
+        enable_digital_ptz=False,
+        presets_file=str(tmp_path / "ptz_presets.json"),
     )
     yield controller
     controller.stop()
 
 
 @pytest.fixture
+def small_ptz_controller(tmp_path):
+    """Create a PTZController with a small (320x180) output for transform tests"""
+    controller = PTZController(
+        output_width=320,
+        output_height=180,
+        max_zoom=4.0,
+        enable_digital_ptz=True,
+        presets_file=str(tmp_path / "ptz_presets.json"),
+    )
+    yield controller
+    controller.stop()
+
+
+@pytest.fixture(scope="session")
 def sample_frame():
-    """Create a sample BGR frame for testing"""
+    """Create a sample BGR frame for testing (shared and read-only)"""
     # Create a 1920x1080 BGR frame with a gradient
-    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
-    # Add horizontal gradient (blue channel)
-    frame[:, :, 0] = np.tile(np.linspace(0, 255, 1920), (1080, 1)).astype(np.uint8)
-    # Add vertical gradient (green channel)
-    frame[:, :, 1] = np.tile(np.linspace(0, 255, 1080), (1920, 1)).T.astype(np.uint8)
+    frame = np.empty((1080, 1920, 3), dtype=np.uint8)
+    # Horizontal gradient (blue channel), broadcast down the rows
+    frame[:, :, 0] = np.linspace(0, 255, 1920, dtype=np.uint8)
+    # Vertical gradient (green channel), broadcast across the columns
+    frame[:, :, 1] = np.linspace(0, 255, 1080, dtype=np.uint8)[:, None]
     # Set red channel to constant
     frame[:, :, 2] = 128
+    # Shared across the session: make accidental writes fail loudly
+    frame.flags.writeable = False
+    return frame
+
+
+@pytest.fixture(scope="session")
+def sample_frame_small():
+    """Create a small 640x360 BGR gradient frame (shared and read-only)"""
+    frame = np.empty((360, 640, 3), dtype=np.uint8)
+    frame[:, :, 0] = np.linspace(0, 255, 640, dtype=np.uint8)
+    frame[:, :, 1] = np.linspace(0, 255, 360, dtype=np.uint8)[:, None]
+    frame[:, :, 2] = 128
+    frame.flags.writeable = False
     return frame
 
 
@@ -136,10 +165,9 @@ def grayscale_frame():
 @pytest.fixture
 def mock_wfile():
     """Create a mock writable file object for MJPEG client testing"""
-    mock = MagicMock()
-    mock.write = MagicMock()
-    mock.flush = MagicMock()
-    return mock
+    # Clients only call write/flush; a specced Mock is much cheaper to build
+    # than a MagicMock and rejects any other attribute access.
+    return Mock(spec=['write', 'flush'])
 
 
 @pytest.fixture
@@ -172,14 +200,33 @@ def temp_presets_file():
         os.unlink(temp_path)
 
 
+class RecordingHardwareHandler(PTZHardwareHandler):
+    """PTZ hardware handler that records each notification as (method, args)"""
+
+    def __init__(self):
+        self.calls = []
+
+    def on_continuous_move(self, pan_speed, tilt_speed, zoom_speed):
+        self.calls.append(('on_continuous_move', (pan_speed, tilt_speed, zoom_speed)))
+
+    def on_stop(self):
+        self.calls.append(('on_stop', ()))
+
+    def on_absolute_move(self, pan, tilt, zoom):
+        self.calls.append(('on_absolute_move', (pan, tilt, zoom)))
+
+    def on_relative_move(self, pan_delta, tilt_delta, zoom_delta):
+        self.calls.append(('on_relative_move', (pan_delta, tilt_delta, zoom_delta)))
+
+    def on_goto_preset(self, token, pan, tilt, zoom):
+        self.calls.append(('on_goto_preset', (token, pan, tilt, zoom)))
+
+    def on_goto_home(self):
+        self.calls.append(('on_goto_home', ()))
+
+
 @pytest.fixture
 def mock_hardware_handler():
-    """Create a mock PTZ hardware handler for testing"""
-    handler = MagicMock()
-    handler.on_continuous_move = MagicMock()
-    handler.on_stop = MagicMock()
-    handler.on_absolute_move = MagicMock()
-    handler.on_relative_move = MagicMock()
-    handler.on_goto_preset = MagicMock()
-    handler.on_goto_home = MagicMock()
-    return handler
+    """Create a recording PTZ hardware handler for testing"""
+    # A plain recorder is far cheaper per call than MagicMock's call tracking
+    return RecordingHardwareHandler()
@@ -8,6 +8,7 @@ the capture thread is mutating in place.
 """
 
 import os
+import time
 from unittest.mock import MagicMock
 
 import numpy as np
@@ -580,6 +581,32 @@ class TestMjpegStreamerSubDimensions:
         finally:
             camera.stop()
 
+    def test_start_passes_turbojpeg_option(self, monkeypatch):
+        mocks = _patch_start_dependencies(monkeypatch)
+        camera = make_camera_for_start(CameraConfig(mjpeg_use_turbojpeg=True))
+        try:
+            assert camera.start() is True
+            kwargs = mocks["mjpeg_cls"].call_args.kwargs
+            assert kwargs["use_turbojpeg"] is True
+        finally:
+            camera.stop()
+
+
+class TestPtzOptions:
+    def test_ptz_use_opencl_passed_to_controller(self):
+        camera = IPCamera(CameraConfig(ptz_use_opencl=True))
+        try:
+            assert camera.ptz.use_opencl == cv2.ocl.haveOpenCL()
+        finally:
+            camera.ptz.stop()
+
+    def test_ptz_subpixel_passed_to_controller(self):
+        camera = IPCamera(CameraConfig(ptz_subpixel=True))
+        try:
+            assert camera.ptz.subpixel is True
+        finally:
+            camera.ptz.stop()
+
 
 class TestStop:
     def test_stop_calls_stop_on_every_subsystem(self, monkeypatch):
@@ -1029,6 +1056,48 @@ class TestStatsProperty:
         assert camera.stats is fake_stats
 
 
+class TestPaceFrame:
+    def test_paces_to_target_fps(self):
+        camera = make_camera()
+        camera.config.main_fps = 200  # 5 ms per frame
+        start = time.monotonic()
+        for _ in range(11):  # the first frame starts the clock
+            camera._pace_frame()
+        elapsed = time.monotonic() - start
+        assert 0.05 <= elapsed < 0.5
+
+    def test_late_frame_does_not_sleep(self, monkeypatch):
+        camera = make_camera()
+        camera.config.main_fps = 30
+        camera._pace_frame()
+        camera._stream_start_time -= 10 * 1_000_000_000  # 10 s behind schedule
+        sleeps = []
+        monkeypatch.setattr("ipycam.camera.time.sleep", sleeps.append)
+        camera._pace_frame()
+        assert sleeps == []
+
+    def test_fps_change_restarts_schedule(self):
+        camera = make_camera()
+        camera.config.main_fps = 1000
+        camera._pace_frame()
+        camera._pace_frame()
+        camera.config.main_fps = 500
+        camera._pace_frame()
+        assert camera._frame_count == 1
+        assert camera._last_fps == 500
+
+    def test_timer_resolution_raised_on_start_and_restored_on_stop(self, monkeypatch):
+        _patch_start_dependencies(monkeypatch)
+        calls = []
+        monkeypatch.setattr("ipycam.camera._set_windows_timer_resolution",
+                            lambda enable: calls.append(enable) or True)
+        camera = make_camera_for_start()
+        camera.start()
+        camera.stop()
+        camera.stop()  # a second stop must not restore twice
+        assert calls == [True, False]
+
+
 class TestDrawTimestampPositions:
     """IPCamera._draw_timestamp positions the overlay per config.timestamp_position."""
 
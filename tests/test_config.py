@@ -134,6 +134,20 @@ class TestCameraConfigURLProperties:
         expected = f"http://{default_config.local_ip}:{default_config.onvif_port}/onvif/device_service"
         assert default_config.onvif_url == expected
 
+    def test_onvif_service_urls(self, default_config):
+        base = f"http://{default_config.local_ip}:{default_config.onvif_port}"
+        assert default_config.device_url == f"{base}/onvif/device_service"
+        assert default_config.media_url == f"{base}/onvif/media_service"
+        assert default_config.ptz_url == f"{base}/onvif/ptz_service"
+        assert default_config.snapshot_uri == f"{base}/{default_config.snapshot_url}"
+
+    def test_onvif_service_urls_follow_field_changes(self, default_config):
+        assert default_config.media_url  # populate the memoized URLs
+        default_config.local_ip = "10.0.0.5"
+        default_config.onvif_port = 9999
+        assert default_config.media_url == "http://10.0.0.5:9999/onvif/media_service"
+        assert default_config.onvif_url == "http://10.0.0.5:9999/onvif/device_service"
+
     def test_webrtc_url(self, default_config):
         expected = f"http://{default_config.local_ip}:{default_config.go2rtc_api_port}"
         assert default_config.webrtc_url == expected
@@ -305,6 +305,21 @@ def test_main_video_upload_mode_placeholder_then_exit(monkeypatch, patched_confi
     assert len(camera.stream_calls) == 1  # placeholder frame streamed once
 
 
+def test_main_video_upload_mode_placeholder_rendered_once_and_copied(monkeypatch, patched_config, patched_logging):
+    camera = FakeCamera(patched_config, is_running_seq=[True, True, False])
+    _install_camera(monkeypatch, camera)
+    monkeypatch.setattr(sys, "argv", ["ipycam", "--source", "video"])
+    text_sizes = []
+    real_get_text_size = cv2.getTextSize
+    monkeypatch.setattr(cv2, "getTextSize", lambda *a: text_sizes.append(a) or real_get_text_size(*a))
+
+    assert main() == 0
+    first, second = camera.stream_calls
+    assert len(text_sizes) == 1
+    # Each frame is its own buffer, so in-place overlays can't accumulate
+    assert first is not second
+    np.testing.assert_array_equal(first, second)
+
 def test_main_video_upload_mode_valid_video_streams_frames(monkeypatch, patched_config, tmp_path, patched_logging):
     """Covers the happy-path read AND the "loop the video" (ret=False ->
     cap.set(POS_FRAMES, 0); continue) branch inside the inner streaming loop."""
@@ -5,7 +5,7 @@ Tests for MJPEGStreamer and helper functions
 import threading
 import time
 from io import BytesIO
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 import numpy as np
@@ -40,6 +40,12 @@ def _wait(pred, timeout=2.0, interval=0.005):
     return pred()
 
 
+def _mock_wfile():
+    """A client wfile double. Only write/flush are used, so a specced Mock is
+    enough; MagicMock's magic-method setup is not needed here."""
+    return Mock(spec=['write', 'flush'])
+
+
 def _serve_in_thread(streamer, client):
     """Run streamer.serve_client(client) on a daemon thread (the HTTP writer)."""
     t = threading.Thread(target=streamer.serve_client, args=(client,), daemon=True)
@@ -47,6 +53,14 @@ def _serve_in_thread(streamer, client):
     return t
 
 
+@pytest.fixture
+def streamer():
+    """A default MJPEGStreamer, stopped (worker joined) after the test."""
+    s = MJPEGStreamer()
+    yield s
+    s.stop()
+
+
 class TestMJPEGClient:
     """Tests for MJPEGClient dataclass"""
 
@@ -65,16 +79,14 @@ class TestMJPEGClient:
 class TestMJPEGStreamerInitialization:
     """Tests for MJPEGStreamer initialization"""
 
-    def test_default_quality(self):
-        streamer = MJPEGStreamer()
+    def test_default_quality(self, streamer):
         assert streamer.quality == 80
 
     def test_custom_quality(self):
         streamer = MJPEGStreamer(quality=50)
         assert streamer.quality == 50
 
-    def test_initial_state(self):
-        streamer = MJPEGStreamer()
+    def test_initial_state(self, streamer):
         assert streamer._is_running is False
         assert streamer._last_frame is None
         assert streamer._frame_count == 0
@@ -84,27 +96,23 @@ class TestMJPEGStreamerInitialization:
 class TestMJPEGStreamerStartStop:
     """Tests for MJPEGStreamer start/stop"""
 
-    def test_start_sets_running(self):
-        streamer = MJPEGStreamer()
+    def test_start_sets_running(self, streamer):
         result = streamer.start()
         assert result is True
         assert streamer.is_running is True
         assert streamer._start_time is not None
 
-    def test_start_resets_counters(self):
-        streamer = MJPEGStreamer()
+    def test_start_resets_counters(self, streamer):
         streamer._frame_count = 100
         streamer.start()
         assert streamer._frame_count == 0
 
-    def test_stop_clears_running(self):
-        streamer = MJPEGStreamer()
+    def test_stop_clears_running(self, streamer):
         streamer.start()
         streamer.stop()
         assert streamer.is_running is False
 
-    def test_stop_disconnects_clients(self, mock_wfile):
-        streamer = MJPEGStreamer()
+    def test_stop_disconnects_clients(self, streamer, mock_wfile):
         streamer.start()
         client = streamer.add_client(mock_wfile)
         assert client.connected is True
@@ -117,21 +125,19 @@ class TestMJPEGStreamerStartStop:
 class TestMJPEGStreamerClientManagement:
     """Tests for MJPEGStreamer client management"""
 
-    def test_add_client(self, mock_wfile):
-        streamer = MJPEGStreamer()
+    def test_add_client(self, streamer, mock_wfile):
         streamer.start()
         client = streamer.add_client(mock_wfile)
         assert isinstance(client, MJPEGClient)
         assert client.wfile is mock_wfile
         assert streamer.client_count == 1
 
-    def test_add_multiple_clients(self):
-        streamer = MJPEGStreamer()
+    def test_add_multiple_clients(self, streamer):
         streamer.start()
 
-        mock1 = MagicMock()
-        mock2 = MagicMock()
-        mock3 = MagicMock()
+        mock1 = _mock_wfile()
+        mock2 = _mock_wfile()
+        mock3 = _mock_wfile()
 
         streamer.add_client(mock1)
         streamer.add_client(mock2)
@@ -139,8 +145,7 @@ class TestMJPEGStreamerClientManagement:
 
         assert streamer.client_count == 3
 
-    def test_remove_client(self, mock_wfile):
-        streamer = MJPEGStreamer()
+    def test_remove_client(self, streamer, mock_wfile):
         streamer.start()
         client = streamer.add_client(mock_wfile)
         assert streamer.client_count == 1
@@ -149,8 +154,29 @@ class TestMJPEGStreamerClientManagement:
         assert streamer.client_count == 0
         assert client.connected is False
 
-    def test_remove_nonexistent_client(self, mock_wfile):
-        streamer = MJPEGStreamer()
+    def test_remove_client_only_removes_that_client(self, streamer):
+        # Clients with identical field values are still distinct clients
+        wfile = _mock_wfile()
+        c1 = streamer.add_client(wfile)
+        c2 = streamer.add_client(wfile)
+        streamer.remove_client(c2)
+        assert list(streamer._clients.values()) == [c1]
+        assert streamer._clients[id(c1)] is c1
+
+    def test_client_snapshot_tracks_membership(self, streamer, mock_wfile):
+        assert streamer._client_snapshot == ()
+        c1 = streamer.add_client(mock_wfile)
+        c2 = streamer.add_client(mock_wfile)
+        assert streamer._client_snapshot == (c1, c2)
+        snapshot = streamer._client_snapshot
+        streamer.remove_client(c1)
+        assert streamer._client_snapshot == (c2,)
+        # Earlier snapshots are never mutated under a reader
+        assert snapshot == (c1, c2)
+        streamer.stop()
+        assert streamer._client_snapshot == ()
+
+    def test_remove_nonexistent_client(self, streamer, mock_wfile):
         streamer.start()
         client = MJPEGClient(wfile=mock_wfile)
         # Should not raise
@@ -160,14 +186,12 @@ class TestMJPEGStreamerClientManagement:
 class TestMJPEGStreamerFrameStreaming:
     """Tests for MJPEGStreamer frame streaming"""
 
-    def test_stream_frame_not_running(self, small_frame):
-        streamer = MJPEGStreamer()
+    def test_stream_frame_not_running(self, streamer, small_frame):
         # Not started
         result = streamer.stream_frame(small_frame)
         assert result is False
 
-    def test_stream_frame_no_clients(self, small_frame):
-        streamer = MJPEGStreamer()
+    def test_stream_frame_no_clients(self, streamer, small_frame):
         streamer.start()
         # No clients connected
         result = streamer.stream_frame(small_frame)
@@ -175,10 +199,9 @@ class TestMJPEGStreamerFrameStreaming:
         # But frame count should still increment
         assert streamer.frames_sent == 1
 
-    def test_stream_frame_with_client(self, small_frame, mock_wfile):
+    def test_stream_frame_with_client(self, streamer, small_frame, mock_wfile):
         # Adapted for the async design: stream_frame() enqueues, the worker
         # encodes, and the client's own writer (serve_client) delivers.
-        streamer = MJPEGStreamer()
         streamer.start()
         client = streamer.add_client(mock_wfile)
         writer = _serve_in_thread(streamer, client)
@@ -193,18 +216,16 @@ class TestMJPEGStreamerFrameStreaming:
         streamer.stop()
         writer.join(timeout=2.0)
 
-    def test_stream_frame_stores_last_frame(self, small_frame):
+    def test_stream_frame_stores_last_frame(self, streamer, small_frame):
         # _last_frame is now set by the encode worker (async), so wait for it.
-        streamer = MJPEGStreamer()
         streamer.start()
         streamer.stream_frame(small_frame)
         assert _wait(lambda: streamer._last_frame is not None)
         streamer.stop()
 
-    def test_stream_frame_disconnected_client_removed(self, small_frame, mock_wfile):
+    def test_stream_frame_disconnected_client_removed(self, streamer, small_frame, mock_wfile):
         # A broken write now surfaces on the client's writer thread, which
         # marks the client disconnected and removes it.
-        streamer = MJPEGStreamer()
         streamer.start()
         client = streamer.add_client(mock_wfile)
         mock_wfile.write.side_effect = BrokenPipeError()
@@ -217,12 +238,11 @@ class TestMJPEGStreamerFrameStreaming:
         streamer.stop()
         writer.join(timeout=2.0)
 
-    def test_stream_frame_multiple_clients_partial_failure(self, small_frame):
-        streamer = MJPEGStreamer()
+    def test_stream_frame_multiple_clients_partial_failure(self, streamer, small_frame):
         streamer.start()
 
-        mock1 = MagicMock()
-        mock2 = MagicMock()
+        mock1 = _mock_wfile()
+        mock2 = _mock_wfile()
         mock2.write.side_effect = ConnectionResetError()
 
         c1 = streamer.add_client(mock1)
@@ -242,8 +262,7 @@ class TestMJPEGStreamerFrameStreaming:
         w1.join(timeout=2.0)
         w2.join(timeout=2.0)
 
-    def test_stream_frame_format(self, small_frame, mock_wfile):
-        streamer = MJPEGStreamer()
+    def test_stream_frame_format(self, streamer, small_frame, mock_wfile):
         streamer.start()
         client = streamer.add_client(mock_wfile)
         writer = _serve_in_thread(streamer, client)
@@ -260,6 +279,95 @@ class TestMJPEGStreamerFrameStreaming:
         streamer.stop()
         writer.join(timeout=2.0)
 
+    def test_each_frame_is_a_single_write(self, streamer, small_frame, mock_wfile):
+        streamer.start()
+        client = streamer.add_client(mock_wfile)
+        writer = _serve_in_thread(streamer, client)
+
+        streamer.stream_frame(small_frame)
+        assert _wait(lambda: client.frames_sent == 1)
+
+        # Headers, JPEG and trailer go out together: one write, one flush
+        assert mock_wfile.write.call_count == 1
+        assert mock_wfile.flush.call_count == 1
+        data = mock_wfile.write.call_args[0][0]
+        assert data.endswith(b"\xff\xd9\r\n")
+
+        streamer.stop()
+        writer.join(timeout=2.0)
+
+    def test_wrap_multipart_layout(self, streamer):
+        data = streamer._wrap_multipart(b"JPEGDATA")
+        assert data == (b"--frame\r\nContent-Type: image/jpeg\r\n"
+                        b"Content-Length: 8\r\n\r\nJPEGDATA\r\n")
+
+    def test_clients_share_one_encoded_chunk(self, streamer, small_frame):
+        streamer.start()
+        c1 = streamer.add_client(_mock_wfile())
+        c2 = streamer.add_client(_mock_wfile())
+
+        streamer.stream_frame(small_frame)
+        assert _wait(lambda: len(c1.queue) and len(c2.queue))
+        assert c1.queue.get(timeout=1.0) is c2.queue.get(timeout=1.0)
+
+        streamer.stop()
+
+    def test_unchanged_frame_is_not_reencoded(self, streamer, small_frame):
+        streamer.start()
+        client = streamer.add_client(_mock_wfile())
+        with patch('ipycam.mjpeg.cv2.imencode', wraps=cv2.imencode) as imencode:
+            streamer.stream_frame(small_frame)
+            first = client.queue.get(timeout=2.0)
+            streamer.stream_frame(small_frame.copy())
+            second = client.queue.get(timeout=2.0)
+            assert second is first
+            assert imencode.call_count == 1
+
+            changed = small_frame.copy()
+            changed[0, 0] = (0, 0, 0)
+            streamer.stream_frame(changed)
+            third = client.queue.get(timeout=2.0)
+            assert third is not first
+            assert imencode.call_count == 2
+        streamer.stop()
+
+    def test_quality_change_forces_reencode(self, streamer, small_frame):
+        streamer.start()
+        client = streamer.add_client(_mock_wfile())
+        streamer.stream_frame(small_frame)
+        first = client.queue.get(timeout=2.0)
+        streamer.quality = 20
+        streamer.stream_frame(small_frame)
+        assert client.queue.get(timeout=2.0) != first
+        streamer.stop()
+
+    def test_encode_params_reused_until_quality_changes(self, streamer, small_frame):
+        params = streamer._encode_params
+        assert streamer._encode_jpeg(small_frame).startswith(b"\xff\xd8")
+        assert streamer._encode_params is params
+        streamer.quality = 20
+        streamer._encode_jpeg(small_frame)
+        assert streamer._encode_params == [int(cv2.IMWRITE_JPEG_QUALITY), 20]
+
+    def test_turbojpeg_requested_without_library(self):
+        with patch('ipycam.mjpeg.TURBOJPEG_AVAILABLE', False):
+            streamer = MJPEGStreamer(use_turbojpeg=True)
+        assert streamer.use_turbojpeg is False
+
+    def test_turbojpeg_encode_uses_bgr_420(self, small_frame):
+        fake = MagicMock()
+        fake.encode.return_value = b"\xff\xd8turbo"
+        with patch('ipycam.mjpeg.TURBOJPEG_AVAILABLE', True), \
+                patch('ipycam.mjpeg._turbojpeg', fake), \
+                patch('ipycam.mjpeg.TJPF_BGR', 'bgr', create=True), \
+                patch('ipycam.mjpeg.TJSAMP_420', '420', create=True):
+            streamer = MJPEGStreamer(quality=70, use_turbojpeg=True)
+            assert streamer._encode_jpeg(small_frame) == b"\xff\xd8turbo"
+        fake.encode.assert_called_once()
+        args, kwargs = fake.encode.call_args
+        assert np.array_equal(args[0], small_frame)
+        assert kwargs == {'quality': 70, 'pixel_format': 'bgr', 'jpeg_subsample': '420'}
+
 
 class TestMJPEGStreamerAsyncIsolation:
     """The decoupling contract: stream_frame never blocks and clients are isolated."""
@@ -269,9 +377,9 @@ class TestMJPEGStreamerAsyncIsolation:
         streamer = MJPEGStreamer()
         streamer.start()
 
-        slow = MagicMock()
+        slow = _mock_wfile()
         slow.write.side_effect = lambda data: time.sleep(0.5)  # simulated stall
-        fast = MagicMock()
+        fast = _mock_wfile()
 
         c_slow = streamer.add_client(slow)
         c_fast = streamer.add_client(fast)
@@ -298,9 +406,9 @@ class TestMJPEGStreamerAsyncIsolation:
         streamer = MJPEGStreamer()
         streamer.start()
 
-        broken = MagicMock()
+        broken = _mock_wfile()
         broken.write.side_effect = BrokenPipeError()
-        good = MagicMock()
+        good = _mock_wfile()
 
         c_broken = streamer.add_client(broken)
         c_good = streamer.add_client(good)
@@ -316,7 +424,7 @@ class TestMJPEGStreamerAsyncIsolation:
         assert _wait(pump, timeout=2.0)
         assert c_broken.connected is False
         assert c_good.connected is True
-        assert c_good in streamer._clients
+        assert c_good in streamer._clients.values()
 
         streamer.stop()
         w_broken.join(timeout=2.0)
@@ -353,29 +461,25 @@ def _extract_jpeg(frame_data: bytes) -> bytes:
 class TestMJPEGStreamerSubStreamSelector:
     """Tests for the per-client main/sub stream selector (step 4.2)."""
 
-    def test_add_client_default_stream_is_main(self, mock_wfile):
-        streamer = MJPEGStreamer()
+    def test_add_client_default_stream_is_main(self, streamer, mock_wfile):
         client = streamer.add_client(mock_wfile)
         assert client.stream == 'main'
 
-    def test_add_client_with_sub_stream(self, mock_wfile):
-        streamer = MJPEGStreamer()
+    def test_add_client_with_sub_stream(self, streamer, mock_wfile):
         client = streamer.add_client(mock_wfile, stream='sub')
         assert client.stream == 'sub'
 
-    def test_add_client_invalid_stream_falls_back_to_main(self, mock_wfile):
-        streamer = MJPEGStreamer()
+    def test_add_client_invalid_stream_falls_back_to_main(self, streamer, mock_wfile):
         client = streamer.add_client(mock_wfile, stream='not-a-real-stream')
         assert client.stream == 'main'
 
-    def test_sub_client_gets_resized_frame_main_client_gets_full_size(self, small_frame):
+    def test_sub_client_gets_resized_frame_main_client_gets_full_size(self, streamer, small_frame):
         # small_frame is 480x640x3 (h, w, c). With no fixed sub_width/height,
         # the encode worker falls back to half the incoming frame's size.
-        streamer = MJPEGStreamer()
         streamer.start()
 
-        main_client = streamer.add_client(MagicMock(), stream='main')
-        sub_client = streamer.add_client(MagicMock(), stream='sub')
+        main_client = streamer.add_client(_mock_wfile(), stream='main')
+        sub_client = streamer.add_client(_mock_wfile(), stream='sub')
 
         streamer.stream_frame(small_frame)
 
@@ -397,7 +501,7 @@ class TestMJPEGStreamerSubStreamSelector:
         streamer = MJPEGStreamer(sub_width=160, sub_height=90)
         streamer.start()
 
-        sub_client = streamer.add_client(MagicMock(), stream='sub')
+        sub_client = streamer.add_client(_mock_wfile(), stream='sub')
         streamer.stream_frame(small_frame)
 
         sub_data = sub_client.queue.get(timeout=2.0)
@@ -411,9 +515,9 @@ class TestMJPEGStreamerSubStreamSelector:
         streamer = MJPEGStreamer()
         streamer.start()
 
-        sub1 = streamer.add_client(MagicMock(), stream='sub')
-        sub2 = streamer.add_client(MagicMock(), stream='sub')
-        main_client = streamer.add_client(MagicMock(), stream='main')
+        sub1 = streamer.add_client(_mock_wfile(), stream='sub')
+        sub2 = streamer.add_client(_mock_wfile(), stream='sub')
+        main_client = streamer.add_client(_mock_wfile(), stream='main')
 
         real_imencode = cv2.imencode
         calls = []
@@ -445,7 +549,7 @@ class TestMJPEGStreamerSubStreamSelector:
         """When nobody has selected 'sub', only the main JPEG is encoded."""
         streamer = MJPEGStreamer()
         streamer.start()
-        main_client = streamer.add_client(MagicMock(), stream='main')
+        main_client = streamer.add_client(_mock_wfile(), stream='main')
 
         real_imencode = cv2.imencode
         calls = []
@@ -466,8 +570,7 @@ class TestMJPEGStreamerSubStreamSelector:
 class TestMJPEGStreamerStats:
     """Tests for MJPEGStreamer statistics"""
 
-    def test_frames_sent(self, small_frame):
-        streamer = MJPEGStreamer()
+    def test_frames_sent(self, streamer, small_frame):
         streamer.start()
 
         for _ in range(5):
@@ -475,8 +578,7 @@ class TestMJPEGStreamerStats:
 
         assert streamer.frames_sent == 5
 
-    def test_elapsed_time(self):
-        streamer = MJPEGStreamer()
+    def test_elapsed_time(self, streamer):
         assert streamer.elapsed_time == 0
 
         streamer.start()
@@ -484,13 +586,11 @@ class TestMJPEGStreamerStats:
         elapsed = streamer.elapsed_time
         assert elapsed >= 0.1
 
-    def test_actual_fps_no_frames(self):
-        streamer = MJPEGStreamer()
+    def test_actual_fps_no_frames(self, streamer):
         streamer.start()
         assert streamer.actual_fps == 0
 
-    def test_actual_fps_with_frames(self, small_frame):
-        streamer = MJPEGStreamer()
+    def test_actual_fps_with_frames(self, streamer, small_frame):
         streamer.start()
 
         # Stream some frames
@@ -506,38 +606,38 @@ class TestMJPEGStreamerStats:
 class TestMJPEGStreamerHeaders:
     """Tests for MJPEGStreamer.get_headers()"""
 
-    def test_get_headers_returns_list(self):
-        streamer = MJPEGStreamer()
+    def test_get_headers_returns_list(self, streamer):
         headers = streamer.get_headers()
         assert isinstance(headers, list)
 
-    def test_get_headers_content_type(self):
-        streamer = MJPEGStreamer()
+    def test_get_headers_content_type(self, streamer):
         headers = streamer.get_headers()
         header_dict = dict(headers)
         assert 'Content-Type' in header_dict
         assert 'multipart/x-mixed-replace' in header_dict['Content-Type']
         assert 'boundary=frame' in header_dict['Content-Type']
 
-    def test_get_headers_cache_control(self):
-        streamer = MJPEGStreamer()
+    def test_get_headers_cache_control(self, streamer):
         headers = streamer.get_headers()
         header_dict = dict(headers)
         assert 'Cache-Control' in header_dict
         assert 'no-cache' in header_dict['Cache-Control']
 
+    def test_get_headers_built_once(self, streamer):
+        assert streamer.get_headers() is MJPEGStreamer().get_headers()
+
 
 class TestCheckGo2rtcRunning:
     """Tests for check_go2rtc_running helper function"""
 
     def test_returns_false_when_not_running(self):
         # Use a port that's unlikely to be in use
-        result = check_go2rtc_running(port=59999, timeout=0.5)
+        result = check_go2rtc_running(port=59999, timeout=0.05)
         assert result is False
 
     def test_returns_false_with_invalid_host(self):
         # Invalid host should return False (TEST-NET-1 per RFC 5737)
-        result = check_go2rtc_running(host="192.0.2.1", port=1984, timeout=0.5)
+        result = check_go2rtc_running(host="192.0.2.1", port=1984, timeout=0.05)
         assert result is False
 
     def test_accepts_custom_parameters(self):
@@ -590,6 +690,13 @@ class TestCheckGo2rtcDetectionMocked:
              patch("urllib.request.urlopen", side_effect=urllib.error.URLError("timeout")):
             assert check_go2rtc_running(port=1984, timeout=0.2) is True
 
+    def test_socket_closed_when_connect_raises(self):
+        sock = MagicMock()
+        sock.connect_ex.side_effect = OSError("unreachable")
+        with patch("socket.socket", return_value=sock):
+            assert check_go2rtc_running(port=1984, timeout=0.2) is False
+        sock.close.assert_called_once()
+
     def test_returns_false_when_port_closed(self):
         """Nothing listening on the API port -> not detected."""
         sock = self._fake_socket(1)  # non-zero == connect failed
@@ -602,12 +709,12 @@ class TestCheckRTSPPortAvailable:
 
     def test_returns_false_when_not_available(self):
         # Use a port that's unlikely to be in use
-        result = check_rtsp_port_available(port=59998, timeout=0.5)
+        result = check_rtsp_port_available(port=59998, timeout=0.05)
         assert result is False
 
     def test_returns_false_with_invalid_host(self):
         # Invalid host should return False (TEST-NET-1 per RFC 5737)
-        result = check_rtsp_port_available(host="192.0.2.1", port=8554, timeout=0.5)
+        result = check_rtsp_port_available(host="192.0.2.1", port=8554, timeout=0.05)
         assert result is False
 
     def test_accepts_custom_parameters(self):
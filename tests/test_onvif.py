@@ -41,10 +41,20 @@ class TestONVIFServiceInitialization:
     def test_initialization_with_ptz(self, onvif_service_with_ptz, ptz_controller):
         assert onvif_service_with_ptz.ptz is ptz_controller
 
+    def test_uses_slots(self, onvif_service):
+        assert not hasattr(onvif_service, '__dict__')
+        with pytest.raises(AttributeError):
+            onvif_service.unexpected_attribute = 1
+
     def test_templates_loaded(self, onvif_service):
         assert len(onvif_service._templates) > 0
         assert 'envelope' in onvif_service._templates
 
+    def test_templates_loaded_once_per_process(self, onvif_service, default_config):
+        other = ONVIFService(default_config)
+        assert other._templates is onvif_service._templates
+        assert other._formats is onvif_service._formats
+
 
 class TestONVIFServiceHelpers:
     """Tests for ONVIF helper methods"""
@@ -60,6 +70,27 @@ class TestONVIFServiceHelpers:
     def test_bitrate_to_kbps_numeric(self, onvif_service):
         assert onvif_service._bitrate_to_kbps("1000") == 1000
 
+    def test_body_templates_are_prewrapped_in_envelope(self, onvif_service):
+        result = onvif_service._render('get_users', username='admin')
+        assert result.startswith('<?xml')
+        assert '<s:Body>' in result and '</tds:GetUsersResponse>' in result
+        assert '{{body}}' not in result
+
+    def test_render_substitutes_in_one_pass(self, onvif_service):
+        # A value that looks like a placeholder is not expanded again
+        result = onvif_service._render('get_users', username='{{username}} 100%')
+        assert '<tt:Username>{{username}} 100%</tt:Username>' in result
+
+    def test_render_leaves_missing_placeholders(self, onvif_service):
+        result = onvif_service._render('get_users')
+        assert '{{username}}' in result
+        assert onvif_service._render('no_such_template', x=1) == ''
+
+    def test_standalone_templates_are_not_wrapped(self, onvif_service):
+        assert onvif_service._templates['fault'].count('<s:Envelope') == 1
+        assert onvif_service._templates['envelope'].count('{{body}}') == 1
+        assert not onvif_service._templates['ptz_preset_item'].lstrip().startswith('<?xml')
+
     def test_extract_xml_value(self, onvif_service):
         body = '<test:PresetName>MyPreset</test:PresetName>'
         result = onvif_service._extract_xml_value(body, 'PresetName')
@@ -80,6 +111,28 @@ class TestONVIFServiceHelpers:
         result = onvif_service._extract_xml_attr(body, 'SetPreset', 'PresetToken')
         assert result == 'preset1'
 
+    def test_extract_patterns_compiled_once(self, onvif_service):
+        from ipycam.onvif import _tag_value_re
+        body = '<tt:PresetToken>p1</tt:PresetToken>'
+        assert onvif_service._extract_xml_value(body, 'PresetToken') == 'p1'
+        hits = _tag_value_re.cache_info().hits
+        body = '<tt:PresetToken>p2</tt:PresetToken>'
+        assert onvif_service._extract_xml_value(body, 'PresetToken') == 'p2'
+        assert _tag_value_re.cache_info().hits == hits + 1
+
+    def test_extract_xml_value_memoized_for_repeated_body(self, onvif_service):
+        from ipycam.onvif import _XML_VALUE_CACHE_MAX_BODY, _cached_tag_value
+        body = '<tt:PresetToken>memo</tt:PresetToken>'
+        assert onvif_service._extract_xml_value(body, 'PresetToken') == 'memo'
+        hits = _cached_tag_value.cache_info().hits
+        assert onvif_service._extract_xml_value(body, 'PresetToken') == 'memo'
+        assert _cached_tag_value.cache_info().hits == hits + 1
+        # Oversized bodies bypass the memo
+        big = body + ' ' * _XML_VALUE_CACHE_MAX_BODY
+        misses = _cached_tag_value.cache_info().misses
+        assert onvif_service._extract_xml_value(big, 'PresetToken') == 'memo'
+        assert _cached_tag_value.cache_info().misses == misses
+
     def test_extract_velocity(self, onvif_service):
         body = '''
         <Velocity>
@@ -99,6 +152,15 @@ class TestONVIFServiceHelpers:
         assert tilt == -0.3
         assert zoom == 0.0
 
+    def test_extract_velocity_ignores_elements_outside_velocity(self, onvif_service):
+        body = ('<tt:PanTilt x="0.9" y="0.9"/>'
+                '<Velocity><tt:PanTilt y="-0.3" x="0.5"/></Velocity>')
+        assert onvif_service._extract_velocity(body) == (0.5, -0.3, 0.0)
+
+    def test_extract_velocity_without_wrapper(self, onvif_service):
+        body = '<tt:PanTilt x="0.5" y="-0.3"/><tt:Zoom x="0.2"/>'
+        assert onvif_service._extract_velocity(body) == (0.5, -0.3, 0.2)
+
     def test_extract_position(self, onvif_service):
         body = '''
         <Position>
@@ -111,6 +173,20 @@ class TestONVIFServiceHelpers:
         assert tilt == -0.3
         assert zoom == 0.7
 
+    def test_extract_position_ignores_elements_outside_position(self, onvif_service):
+        body = '''
+        <tptz:AbsoluteMove>
+            <tptz:Position><tt:Zoom x="0.4"/></tptz:Position>
+            <tptz:Speed><tt:PanTilt x="1.0" y="1.0"/><tt:Zoom x="1.0"/></tptz:Speed>
+        </tptz:AbsoluteMove>
+        '''
+        pan, tilt, zoom = onvif_service._extract_position(body)
+        assert (pan, tilt, zoom) == (None, None, 0.4)
+
+    def test_extract_position_missing_section(self, onvif_service):
+        assert onvif_service._extract_position('<Other/>') == (None, None, None)
+        assert onvif_service._extract_translation('<Other/>') == (0.0, 0.0, 0.0)
+
     def test_extract_translation(self, onvif_service):
         body = '''
         <Translation>
@@ -172,6 +248,16 @@ class TestONVIFServiceDeviceInfo:
         # Should contain SOAP envelope
         assert 'Envelope' in result
 
+    def test_get_system_date_time_cached_within_second(self, onvif_service):
+        with patch('ipycam.onvif.time.time', return_value=1700000000.2):
+            first = onvif_service.get_system_date_time()
+        with patch('ipycam.onvif.time.time', return_value=1700000000.9):
+            assert onvif_service.get_system_date_time() is first
+        with patch('ipycam.onvif.time.time', return_value=1700000001.0):
+            later = onvif_service.get_system_date_time()
+        assert '<tt:Second>20</tt:Second>' in first
+        assert '<tt:Second>21</tt:Second>' in later
+
     def test_get_capabilities(self, onvif_service, default_config):
         result = onvif_service.get_capabilities()
         assert isinstance(result, str)
@@ -189,6 +275,15 @@ class TestONVIFServiceDeviceInfo:
         assert isinstance(result, str)
         assert default_config.name in result
 
+    def test_config_responses_are_cached(self, onvif_service):
+        first = onvif_service.get_capabilities()
+        assert onvif_service.get_capabilities() is first
+
+    def test_cached_responses_follow_config_changes(self, onvif_service, default_config):
+        onvif_service.get_scopes()
+        default_config.name = "Renamed Camera"
+        assert "Renamed Camera" in onvif_service.get_scopes()
+
     def test_get_users(self, onvif_service):
         result = onvif_service.get_users()
         assert isinstance(result, str)
@@ -354,12 +449,27 @@ class TestONVIFServicePTZ:
         assert 'test' in result
         assert 'Test Preset' in result
 
+    def test_ptz_get_presets_renders_every_preset(self, onvif_service_with_ptz, ptz_controller):
+        from ipycam.ptz import PTZPreset
+
+        ptz_controller.presets.clear()
+        for i in range(3):
+            ptz_controller.presets[f'p{i}'] = PTZPreset(
+                token=f'p{i}', name=f'Preset {i}', pan=0.1 * i, tilt=0.0, zoom=0.5)
+        result = onvif_service_with_ptz.ptz_get_presets('')
+        assert result.count('<tptz:Preset ') == 3
+        assert '<tt:Name>Preset 2</tt:Name>' in result
+        assert '{{' not in result
+
     def test_ptz_set_preset(self, onvif_service_with_ptz, ptz_controller):
         ptz_controller.absolute_move(pan=0.5, tilt=0.3, zoom=0.2)
         body = '<PresetName>New Preset</PresetName>'
         result = onvif_service_with_ptz.ptz_set_preset(body)
         assert isinstance(result, str)
         assert 'preset_' in result  # Auto-generated token
+        token = next(t for t in ptz_controller.presets if t.startswith('preset_'))
+        assert len(token) == len('preset_') + 8
+        int(token[len('preset_'):], 16)  # 8 hex chars
 
     def test_ptz_goto_preset(self, onvif_service_with_ptz, ptz_controller):
         ptz_controller.absolute_move(pan=0.5, tilt=0.3, zoom=0.2)
@@ -405,11 +515,44 @@ class TestONVIFServiceActionHandler:
         result = onvif_service_with_ptz.handle_action('ContinuousMove', body)
         assert result is not None
 
+    def test_handle_action_ptz_without_controller_faults(self, onvif_service):
+        result = onvif_service.handle_action('ContinuousMove', '')
+        assert 'not supported' in result.lower()
+        assert 'ContinuousMoveResponse' not in result
+
+    @pytest.mark.parametrize("action", [
+        'http://www.onvif.org/ver10/device/wsdl/GetServiceCapabilities',
+        'http://www.onvif.org/ver10/media/wsdl/GetServiceCapabilities',
+        'GetServiceCapabilities',
+    ])
+    def test_handle_action_service_capabilities_without_controller(self, onvif_service, action):
+        result = onvif_service.handle_action(action, '')
+        assert 'not supported' not in result.lower()
+        assert 'GetServiceCapabilitiesResponse' in result
+
+    def test_handle_action_ptz_namespace_shared_action_without_controller_faults(self, onvif_service):
+        result = onvif_service.handle_action(
+            'http://www.onvif.org/ver20/ptz/wsdl/GetConfigurations', '')
+        assert 'not supported' in result.lower()
+
     def test_handle_action_unsupported(self, onvif_service):
         result = onvif_service.handle_action('UnsupportedAction', '')
         assert result is not None
         assert 'not supported' in result.lower() or 'fault' in result.lower()
 
+    def test_handle_action_full_soap_action_uri(self, onvif_service_with_ptz):
+        result = onvif_service_with_ptz.handle_action(
+            'http://www.onvif.org/ver20/ptz/wsdl/GetNodes', '')
+        assert 'GetNodesResponse' in result
+        result = onvif_service_with_ptz.handle_action(
+            'http://www.onvif.org/ver10/device/wsdl/GetDeviceInformation', '')
+        assert 'GetDeviceInformationResponse' in result
+
+    def test_handle_action_substring_fallback(self, onvif_service):
+        # Non-URI action strings that merely contain a known name still route
+        result = onvif_service.handle_action('tds:GetCapabilities', '')
+        assert 'GetCapabilitiesResponse' in result
+
 
 class TestONVIFServiceDiscovery:
     """Tests for ONVIF WS-Discovery methods"""
@@ -422,6 +565,21 @@ class TestONVIFServiceDiscovery:
         assert onvif_service.device_uuid in result
         assert default_config.name in result
 
+    def test_create_probe_match_reuses_constant_fields(self, onvif_service):
+        first = onvif_service.create_probe_match('urn:uuid:a')
+        fmt = onvif_service._probe_match_fmt
+        second = onvif_service.create_probe_match('urn:uuid:b%s')
+        assert onvif_service._probe_match_fmt is fmt
+        assert '<wsa:RelatesTo>urn:uuid:b%s</wsa:RelatesTo>' in second
+        # Each response still gets its own MessageID
+        assert first.split('<wsa:MessageID>')[1][:45] != second.split('<wsa:MessageID>')[1][:45]
+
+    def test_create_probe_match_follows_config_changes(self, onvif_service):
+        onvif_service.create_probe_match('urn:uuid:a')
+        onvif_service.config.name = '100% Cam'
+        result = onvif_service.create_probe_match('urn:uuid:a')
+        assert 'onvif://www.onvif.org/name/100% Cam</d:Scopes>' in result
+
 
 class TestONVIFServiceFault:
     """Tests for ONVIF fault responses"""
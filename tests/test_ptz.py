@@ -2,13 +2,29 @@
 Tests for PTZController
 """
 
-import time
+import threading
+from types import MappingProxyType
 import pytest
 import numpy as np
+import cv2
 
 from ipycam.ptz import PTZController, PTZState, PTZVelocity, PTZPreset
 
 
+@pytest.fixture(params=[(0.5, 0.3, 0.2), (0.0, 0.0, 0.5), (-0.7, 0.4, 0.1)])
+def stored_preset(request, ptz_controller):
+    """A controller back at home with a preset stored at request.param.
+
+    Returns (controller, preset token, (pan, tilt, zoom)).
+    """
+    pan, tilt, zoom = request.param
+    ptz_controller.absolute_move(pan=pan, tilt=tilt, zoom=zoom)
+    ptz_controller.set_preset("preset1", "Test Preset")
+    ptz_controller.goto_home()
+    return ptz_controller, "preset1", request.param
+
+
+@pytest.mark.fast
 class TestPTZDataClasses:
     """Tests for PTZ data classes"""
 
@@ -30,6 +46,15 @@ class TestPTZDataClasses:
         assert velocity.tilt_speed == 0.0
         assert velocity.zoom_speed == 0.0
 
+    def test_state_and_velocity_use_slots(self):
+        state = PTZState(pan=0.5)
+        velocity = PTZVelocity(tilt_speed=-0.2)
+        assert not hasattr(state, '__dict__')
+        assert not hasattr(velocity, '__dict__')
+        assert state == PTZState(0.5, 0.0, 0.0)
+        assert velocity != PTZVelocity()
+        assert repr(state) == "PTZState(pan=0.5, tilt=0.0, zoom=0.0)"
+
     def test_ptz_preset_creation(self):
         preset = PTZPreset(
             token="preset1",
@@ -45,6 +70,7 @@ class TestPTZDataClasses:
         assert preset.zoom == 0.2
 
 
+@pytest.mark.fast
 class TestPTZControllerInitialization:
     """Tests for PTZController initialization"""
 
@@ -72,26 +98,27 @@ class TestPTZControllerInitialization:
         assert 'home' in presets
 
 
+@pytest.mark.fast
 class TestPTZAbsoluteMove:
     """Tests for PTZController.absolute_move()"""
 
-    def test_absolute_move_pan(self, ptz_controller):
-        ptz_controller.absolute_move(pan=0.5)
-        assert ptz_controller.state.pan == 0.5
-        assert ptz_controller.state.tilt == 0.0  # Unchanged
-        assert ptz_controller.state.zoom == 0.0  # Unchanged
-
-    def test_absolute_move_tilt(self, ptz_controller):
-        ptz_controller.absolute_move(tilt=-0.3)
-        assert ptz_controller.state.pan == 0.0  # Unchanged
-        assert ptz_controller.state.tilt == -0.3
-        assert ptz_controller.state.zoom == 0.0  # Unchanged
-
-    def test_absolute_move_zoom(self, ptz_controller):
-        ptz_controller.absolute_move(zoom=0.7)
-        assert ptz_controller.state.pan == 0.0  # Unchanged
-        assert ptz_controller.state.tilt == 0.0  # Unchanged
-        assert ptz_controller.state.zoom == 0.7
+    @pytest.mark.parametrize("axis,value,expected", [
+        ("pan", 0.5, 0.5),
+        ("tilt", -0.3, -0.3),
+        ("zoom", 0.7, 0.7),
+        # Out-of-range values are clamped
+        ("pan", 2.0, 1.0),
+        ("pan", -2.0, -1.0),
+        ("tilt", 2.0, 1.0),
+        ("tilt", -2.0, -1.0),
+        ("zoom", 2.0, 1.0),
+        ("zoom", -1.0, 0.0),
+    ])
+    def test_absolute_move_single_axis(self, ptz_controller, axis, value, expected):
+        ptz_controller.absolute_move(**{axis: value})
+        for name in ("pan", "tilt", "zoom"):
+            # The other axes are unchanged
+            assert getattr(ptz_controller.state, name) == pytest.approx(expected if name == axis else 0.0)
 
     def test_absolute_move_all(self, ptz_controller):
         ptz_controller.absolute_move(pan=0.5, tilt=-0.3, zoom=0.7)
@@ -99,36 +126,16 @@ class TestPTZAbsoluteMove:
         assert ptz_controller.state.tilt == -0.3
         assert ptz_controller.state.zoom == 0.7
 
-    def test_absolute_move_clamps_pan_max(self, ptz_controller):
-        ptz_controller.absolute_move(pan=2.0)
-        assert ptz_controller.state.pan == 1.0
-
-    def test_absolute_move_clamps_pan_min(self, ptz_controller):
-        ptz_controller.absolute_move(pan=-2.0)
-        assert ptz_controller.state.pan == -1.0
-
-    def test_absolute_move_clamps_tilt_max(self, ptz_controller):
-        ptz_controller.absolute_move(tilt=2.0)
-        assert ptz_controller.state.tilt == 1.0
-
-    def test_absolute_move_clamps_tilt_min(self, ptz_controller):
-        ptz_controller.absolute_move(tilt=-2.0)
-        assert ptz_controller.state.tilt == -1.0
-
-    def test_absolute_move_clamps_zoom_max(self, ptz_controller):
-        ptz_controller.absolute_move(zoom=2.0)
-        assert ptz_controller.state.zoom == 1.0
-
-    def test_absolute_move_clamps_zoom_min(self, ptz_controller):
-        ptz_controller.absolute_move(zoom=-1.0)
-        assert ptz_controller.state.zoom == 0.0
-
     def test_absolute_move_stops_continuous_movement(self, ptz_controller):
         ptz_controller.continuous_move(pan_speed=0.5, tilt_speed=0.5)
         ptz_controller.absolute_move(pan=0.0)
         assert ptz_controller.velocity.pan_speed == 0.0
         assert ptz_controller.velocity.tilt_speed == 0.0
 
+    def test_absolute_move_publishes_state_snapshot(self, ptz_controller):
+        ptz_controller.absolute_move(pan=0.5, tilt=-0.25, zoom=0.75)
+        assert ptz_controller._state_tuple == (0.5, -0.25, 0.75)
+
     def test_absolute_move_updates_is_default_flag(self, ptz_controller):
         ptz_controller.absolute_move(pan=0.5)
         assert ptz_controller._is_default is False
@@ -137,6 +144,7 @@ class TestPTZAbsoluteMove:
         assert ptz_controller._is_default is True
 
 
+@pytest.mark.fast
 class TestPTZRelativeMove:
     """Tests for PTZController.relative_move()"""
 
@@ -164,7 +172,7 @@ class TestPTZRelativeMove:
     def test_relative_move_clamps_values(self, ptz_controller):
         ptz_controller.absolute_move(pan=0.9)
         ptz_controller.relative_move(pan_delta=0.5)
-        assert ptz_controller.state.pan == 1.0
+        assert ptz_controller.state.pan == pytest.approx(1.0)
 
     def test_relative_move_stops_continuous_movement(self, ptz_controller):
         ptz_controller.continuous_move(pan_speed=0.5)
@@ -183,9 +191,9 @@ class TestPTZContinuousMove:
 
     def test_continuous_move_clamps_velocity(self, ptz_controller):
         ptz_controller.continuous_move(pan_speed=2.0, tilt_speed=-2.0, zoom_speed=2.0)
-        assert ptz_controller.velocity.pan_speed == 1.0
-        assert ptz_controller.velocity.tilt_speed == -1.0
-        assert ptz_controller.velocity.zoom_speed == 1.0
+        assert ptz_controller.velocity.pan_speed == pytest.approx(1.0)
+        assert ptz_controller.velocity.tilt_speed == pytest.approx(-1.0)
+        assert ptz_controller.velocity.zoom_speed == pytest.approx(1.0)
 
     def test_stop_movement_stops_all(self, ptz_controller):
         ptz_controller.continuous_move(pan_speed=0.5, tilt_speed=0.5, zoom_speed=0.5)
@@ -208,6 +216,37 @@ class TestPTZContinuousMove:
         assert ptz_controller.velocity.tilt_speed == 0.5
         assert ptz_controller.velocity.zoom_speed == 0.0
 
+    def test_continuous_move_wakes_idle_loop(self, ptz_controller):
+        ptz_controller.continuous_move(pan_speed=1.0)
+        waiter = threading.Event()
+        for _ in range(100):
+            if ptz_controller.state.pan > 0.0:
+                break
+            waiter.wait(0.01)
+        ptz_controller.stop_movement()
+        assert ptz_controller.state.pan > 0.0
+
+    def test_moves_reset_velocity_in_place(self, ptz_controller):
+        velocity = ptz_controller.velocity
+        ptz_controller.continuous_move(pan_speed=0.5)
+        ptz_controller.absolute_move(pan=0.2)
+        assert ptz_controller.velocity is velocity
+        assert velocity == PTZVelocity()
+
+    def test_stop_wakes_idle_loop(self, tmp_path):
+        controller = PTZController(presets_file=str(tmp_path / "ptz_presets.json"))
+        controller.stop()
+        assert not controller._movement_thread.is_alive()
+
+    def test_clamp_position(self, ptz_controller):
+        assert ptz_controller._clamp_position(1.5, -2.0, 1.2) == (1.0, -1.0, 1.0)
+        assert ptz_controller._clamp_position(-1.5, 2.0, -0.2) == (-1.0, 1.0, 0.0)
+        assert ptz_controller._clamp_position(0.3, -0.4, 0.5) == (0.3, -0.4, 0.5)
+
+    def test_clamp_position_wrap_pan_leaves_pan(self, ptz_controller):
+        ptz_controller.wrap_pan = True
+        assert ptz_controller._clamp_position(1.5, 0.0, 0.0) == (1.5, 0.0, 0.0)
+
 
 class TestPTZGoHome:
     """Tests for PTZController.goto_home()"""
@@ -253,6 +292,15 @@ class TestPTZGetStatus:
         status = ptz_controller.get_status()
         assert status['moving'] is True
 
+    def test_get_status_reads_position(self, ptz_controller):
+        ptz_controller.absolute_move(pan=0.25, tilt=-0.5, zoom=0.5)
+        status = ptz_controller.get_status()
+        assert (status['pan'], status['tilt'], status['zoom']) == (0.25, -0.5, 0.5)
+
+    def test_get_status_reports_direct_state_write(self, ptz_controller):
+        ptz_controller.state.zoom = 0.3  # as examples/360_ptz.py does
+        assert ptz_controller.get_status()['zoom'] == 0.3
+
 
 class TestPTZPresets:
     """Tests for PTZ preset management"""
@@ -267,18 +315,14 @@ class TestPTZPresets:
         assert presets["preset1"].name == "Test Preset"
         assert presets["preset1"].pan == 0.5
 
-    def test_goto_preset_moves_to_position(self, ptz_controller):
-        ptz_controller.absolute_move(pan=0.5, tilt=0.3, zoom=0.2)
-        ptz_controller.set_preset("preset1", "Test Preset")
-
-        ptz_controller.goto_home()
-        assert ptz_controller.state.pan == 0.0
+    def test_goto_preset_moves_to_position(self, stored_preset):
+        controller, token, position = stored_preset
+        assert controller.state.pan == 0.0
 
-        result = ptz_controller.goto_preset("preset1")
+        result = controller.goto_preset(token)
         assert result is True
-        assert ptz_controller.state.pan == 0.5
-        assert ptz_controller.state.tilt == 0.3
-        assert ptz_controller.state.zoom == 0.2
+        state = controller.state
+        assert (state.pan, state.tilt, state.zoom) == position
 
     def test_goto_preset_nonexistent_returns_false(self, ptz_controller):
         result = ptz_controller.goto_preset("nonexistent")
@@ -296,12 +340,80 @@ class TestPTZPresets:
         result = ptz_controller.remove_preset("nonexistent")
         assert result is False
 
-    def test_get_presets_returns_copy(self, ptz_controller):
-        presets1 = ptz_controller.get_presets()
-        presets2 = ptz_controller.get_presets()
-        assert presets1 is not presets2
+    def test_get_presets_returns_read_only_view(self, ptz_controller):
+        presets = ptz_controller.get_presets()
+        assert isinstance(presets, MappingProxyType)
+        assert presets is not ptz_controller.presets
+        with pytest.raises(TypeError):
+            presets["injected"] = None
+        assert "injected" not in ptz_controller.presets
 
+    def test_get_presets_view_unaffected_by_later_changes(self, ptz_controller):
+        presets = ptz_controller.get_presets()
+        ptz_controller.set_preset("preset1", "Test Preset")
+        ptz_controller.remove_preset("home")
+        assert list(presets) == ["home"]
+        assert list(ptz_controller.get_presets()) == ["preset1"]
 
+    def test_save_and_load_presets_roundtrip(self, ptz_controller, tmp_path):
+        ptz_controller.absolute_move(pan=0.5, tilt=0.3, zoom=0.2)
+        ptz_controller.set_preset("preset1", "Test Preset")
+        path = str(tmp_path / "presets.json")
+        ptz_controller._save_presets(path)
+
+        ptz_controller.presets.clear()
+        ptz_controller._load_presets(path)
+        preset = ptz_controller.presets["preset1"]
+        assert (preset.name, preset.pan, preset.tilt, preset.zoom) == ("Test Preset", 0.5, 0.3, 0.2)
+
+    def test_save_presets_skips_unchanged_payload(self, ptz_controller, tmp_path):
+        path = tmp_path / "presets.json"
+        ptz_controller._save_presets(str(path))
+        path.unlink()
+
+        ptz_controller._save_presets(str(path))
+        assert not path.exists()
+
+        ptz_controller.presets["extra"] = PTZPreset("extra", "Extra", 0.1, 0.2, 0.3)
+        ptz_controller._save_presets(str(path))
+        assert path.exists()
+        assert not list(tmp_path.glob(".ptz_presets_*"))
+
+    def test_presets_persist_to_presets_file(self, tmp_path):
+        path = tmp_path / "presets.json"
+        controller = PTZController(presets_file=str(path))
+        controller.set_preset("p1", "One")
+        controller.stop()
+        assert path.exists()
+
+        reloaded = PTZController(presets_file=str(path))
+        try:
+            assert reloaded.presets["p1"].name == "One"
+        finally:
+            reloaded.stop()
+
+    def test_preset_saves_are_coalesced(self, ptz_controller, monkeypatch):
+        saves = []
+        monkeypatch.setattr(ptz_controller, '_save_presets', lambda: saves.append(1))
+        ptz_controller.set_preset("p1", "One")
+        ptz_controller.set_preset("p2", "Two")
+        ptz_controller.remove_preset("p1")
+        timer = ptz_controller._save_timer
+        assert saves == []
+
+        timer.join(timeout=2.0)
+        assert saves == [1]
+
+    def test_stop_flushes_pending_preset_save(self, ptz_controller, monkeypatch):
+        saves = []
+        monkeypatch.setattr(ptz_controller, '_save_presets', lambda: saves.append(1))
+        ptz_controller.set_preset("p1", "One")
+        ptz_controller.stop()
+        assert saves == [1]
+        assert ptz_controller._save_timer is None
+
+
+@pytest.mark.slow
 class TestPTZApplyTransform:
     """Tests for PTZController.apply_ptz() frame transformation"""
 
@@ -310,18 +422,18 @@ class TestPTZApplyTransform:
         # At default position, frame should be unchanged
         assert result is sample_frame
 
-    def test_apply_ptz_with_zoom_returns_different(self, ptz_controller, sample_frame):
-        ptz_controller.absolute_move(zoom=0.5)
-        result = ptz_controller.apply_ptz(sample_frame)
+    def test_apply_ptz_with_zoom_returns_different(self, small_ptz_controller, sample_frame_small):
+        small_ptz_controller.absolute_move(zoom=0.5)
+        result = small_ptz_controller.apply_ptz(sample_frame_small)
         # With zoom, frame should be different (cropped and resized)
-        assert result is not sample_frame
-        assert result.shape == (ptz_controller.output_height, ptz_controller.output_width, 3)
+        assert result is not sample_frame_small
+        assert result.shape == (small_ptz_controller.output_height, small_ptz_controller.output_width, 3)
 
-    def test_apply_ptz_with_pan_returns_different(self, ptz_controller, sample_frame):
-        ptz_controller.absolute_move(pan=0.5, zoom=0.3)  # Need some zoom to allow panning
-        result = ptz_controller.apply_ptz(sample_frame)
-        assert result is not sample_frame
-        assert result.shape == (ptz_controller.output_height, ptz_controller.output_width, 3)
+    def test_apply_ptz_with_pan_returns_different(self, small_ptz_controller, sample_frame_small):
+        small_ptz_controller.absolute_move(pan=0.5, zoom=0.3)  # Need some zoom to allow panning
+        result = small_ptz_controller.apply_ptz(sample_frame_small)
+        assert result is not sample_frame_small
+        assert result.shape == (small_ptz_controller.output_height, small_ptz_controller.output_width, 3)
 
     def test_apply_ptz_disabled_returns_unchanged(self, ptz_controller_no_digital, sample_frame):
         ptz_controller_no_digital.absolute_move(zoom=0.5)
@@ -329,11 +441,190 @@ class TestPTZApplyTransform:
         # Digital PTZ disabled, should return unchanged
         assert result is sample_frame
 
-    def test_apply_ptz_output_dimensions(self, ptz_controller, sample_frame):
-        ptz_controller.absolute_move(zoom=0.8)
-        result = ptz_controller.apply_ptz(sample_frame)
-        assert result.shape[0] == ptz_controller.output_height
-        assert result.shape[1] == ptz_controller.output_width
+    def test_apply_ptz_output_dimensions(self, small_ptz_controller, sample_frame_small):
+        small_ptz_controller.absolute_move(zoom=0.8)
+        result = small_ptz_controller.apply_ptz(sample_frame_small)
+        assert result.shape[0] == small_ptz_controller.output_height
+        assert result.shape[1] == small_ptz_controller.output_width
+
+    def test_apply_ptz_downscale_uses_inter_area(self, sample_frame, tmp_path):
+        controller = PTZController(output_width=640, output_height=360,
+                                   presets_file=str(tmp_path / "ptz_presets.json"))
+        try:
+            controller.absolute_move(zoom=0.01)
+            result = controller.apply_ptz(sample_frame)
+            zoom_factor = 1.0 + 0.01 * (controller.max_zoom - 1.0)
+            crop_w, crop_h = int(1920 / zoom_factor), int(1080 / zoom_factor)
+            x1, y1 = 960 - crop_w // 2, 540 - crop_h // 2
+            expected = cv2.resize(sample_frame[y1:y1 + crop_h, x1:x1 + crop_w], (640, 360),
+                                  interpolation=cv2.INTER_AREA)
+            np.testing.assert_array_equal(result, expected)
+        finally:
+            controller.stop()
+
+    def test_apply_ptz_integer_downscale_is_block_average(self, sample_frame, tmp_path):
+        controller = PTZController(output_width=960, output_height=540,
+                                   presets_file=str(tmp_path / "ptz_presets.json"))
+        try:
+            controller.absolute_move(pan=0.5)  # no zoom: crop is the whole frame
+            result = controller.apply_ptz(sample_frame)
+            blocks = sample_frame.reshape(540, 2, 960, 2, 3).astype(np.uint16).sum(axis=(1, 3))
+            np.testing.assert_array_equal(result, ((blocks + 2) // 4).astype(np.uint8))
+        finally:
+            controller.stop()
+
+    def test_apply_ptz_fast_quality_uses_nearest(self, sample_frame, tmp_path):
+        controller = PTZController(resize_quality='fast',
+                                   presets_file=str(tmp_path / "ptz_presets.json"))
+        try:
+            controller.absolute_move(zoom=0.5)
+            result = controller.apply_ptz(sample_frame)
+            assert result.shape == (1080, 1920, 3)
+            # Nearest-neighbour upscaling only ever copies existing pixel values.
+            assert set(np.unique(result[:, :, 2])) == {128}
+        finally:
+            controller.stop()
+
+    def test_apply_ptz_crop_matching_output_skips_resize(self, sample_frame, tmp_path):
+        # 1920x1080 source, 960x540 output: a 2x zoom crop is exactly the
+        # output size, so the crop is returned without resampling.
+        controller = PTZController(output_width=960, output_height=540, max_zoom=2.0,
+                                   presets_file=str(tmp_path / "ptz_presets.json"))
+        try:
+            controller.absolute_move(pan=1.0, zoom=1.0)
+            result = controller.apply_ptz(sample_frame)
+            np.testing.assert_array_equal(result, sample_frame[270:810, 960:1920])
+            # Zero-copy: neither cv2 nor a buffer copy is involved
+            assert np.shares_memory(result, sample_frame)
+        finally:
+            controller.stop()
+
+    def test_apply_ptz_reuses_output_buffer(self, ptz_controller, sample_frame):
+        ptz_controller.absolute_move(zoom=0.5)
+        first = ptz_controller.apply_ptz(sample_frame)
+        expected = first.copy()
+        second = ptz_controller.apply_ptz(sample_frame)
+        assert second is first
+        np.testing.assert_array_equal(second, expected)
+
+    def test_apply_ptz_output_buffer_follows_frame_layout(self, ptz_controller, grayscale_frame):
+        ptz_controller.absolute_move(zoom=0.5)
+        result = ptz_controller.apply_ptz(grayscale_frame)
+        assert result.shape == (ptz_controller.output_height, ptz_controller.output_width)
+
+    def test_apply_ptz_caches_crop_rect(self, ptz_controller, sample_frame):
+        ptz_controller.absolute_move(pan=0.5, zoom=0.5)
+        ptz_controller.apply_ptz(sample_frame)
+        key, rect = ptz_controller._crop_cache
+        assert key[0] == (0.5, 0.0, 0.5)
+        assert rect == ptz_controller._compute_crop_rect(0.5, 0.0, 0.5, 1920, 1080)
+
+        ptz_controller.absolute_move(pan=-0.5)
+        ptz_controller.apply_ptz(sample_frame)
+        _, new_rect = ptz_controller._crop_cache
+        assert new_rect[0] < rect[0]
+
+    def test_max_zoom_change_invalidates_crop(self, ptz_controller, sample_frame):
+        ptz_controller.absolute_move(zoom=1.0)
+        ptz_controller.apply_ptz(sample_frame)
+        _, rect = ptz_controller._crop_cache
+
+        ptz_controller.max_zoom = 2.0
+        ptz_controller.apply_ptz(sample_frame)
+        _, new_rect = ptz_controller._crop_cache
+        assert new_rect == (480, 270, 1440, 810)
+        assert new_rect != rect
+
+    def test_use_opencl_requires_device(self, tmp_path):
+        ptz = PTZController(use_opencl=True, presets_file=str(tmp_path / "ptz_presets.json"))
+        try:
+            assert ptz.use_opencl == cv2.ocl.haveOpenCL()
+        finally:
+            ptz.stop()
+
+    def test_use_opencl_leaves_global_switch_alone(self, tmp_path):
+        before = cv2.ocl.useOpenCL()
+        ptz = PTZController(use_opencl=True, presets_file=str(tmp_path / "ptz_presets.json"))
+        try:
+            assert cv2.ocl.useOpenCL() == before
+        finally:
+            ptz.stop()
+
+    def test_opencl_resize_matches_cpu(self, sample_frame, tmp_path):
+        if not cv2.ocl.haveOpenCL():
+            pytest.skip("OpenCL not available")
+        cpu = PTZController(output_width=640, output_height=360,
+                            presets_file=str(tmp_path / "cpu_presets.json"))
+        gpu = PTZController(output_width=640, output_height=360, use_opencl=True,
+                            presets_file=str(tmp_path / "gpu_presets.json"))
+        try:
+            for ptz in (cpu, gpu):
+                ptz.absolute_move(pan=0.3, zoom=0.5)
+            expected = cpu.apply_ptz(sample_frame)
+            result = gpu.apply_ptz(sample_frame)
+            assert result.shape == expected.shape
+            assert np.abs(result.astype(int) - expected.astype(int)).max() <= 1
+        finally:
+            cpu.stop()
+            gpu.stop()
+
+    def test_subpixel_matches_integer_crop_when_aligned(self, sample_frame, tmp_path):
+        ptz = PTZController(output_width=960, output_height=540, subpixel=True,
+                            presets_file=str(tmp_path / "ptz_presets.json"))
+        try:
+            ptz.absolute_move(zoom=1.0 / 3.0)  # 1.0 + 1/3 * 3.0 = 2x zoom
+            result = ptz.apply_ptz(sample_frame)
+            assert result.shape == (540, 960, 3)
+            np.testing.assert_array_equal(result, sample_frame[270:810, 480:1440])
+        finally:
+            ptz.stop()
+
+    def test_subpixel_pan_moves_smoothly(self, sample_frame, tmp_path):
+        ptz = PTZController(subpixel=True, presets_file=str(tmp_path / "ptz_presets.json"))
+        try:
+            ptz.absolute_move(pan=0.0, zoom=0.5)
+            m0 = ptz._compute_affine(*ptz._state_tuple, 1920, 1080)
+            ptz.absolute_move(pan=0.001)
+            m1 = ptz._compute_affine(*ptz._state_tuple, 1920, 1080)
+            # Less than one source pixel, but not quantized away
+            assert 0.0 < m1[0, 2] - m0[0, 2] < 1.0
+            assert ptz.apply_ptz(sample_frame).shape == sample_frame.shape
+        finally:
+            ptz.stop()
+
+    def test_subpixel_output_resize_between_frames(self, sample_frame_small, tmp_path):
+        ptz = PTZController(output_width=320, output_height=180, subpixel=True,
+                            presets_file=str(tmp_path / "ptz_presets.json"))
+        fresh = PTZController(output_width=640, output_height=360, subpixel=True,
+                              presets_file=str(tmp_path / "fresh_presets.json"))
+        try:
+            for controller in (ptz, fresh):
+                controller.absolute_move(pan=0.2, zoom=0.5)
+            ptz.apply_ptz(sample_frame_small)  # prime the matrix cache
+            # IPCamera resizes the PTZ output at runtime
+            ptz.output_width, ptz.output_height = 640, 360
+            result = ptz.apply_ptz(sample_frame_small)
+            np.testing.assert_array_equal(result, fresh.apply_ptz(sample_frame_small))
+        finally:
+            ptz.stop()
+            fresh.stop()
+
+    def test_apply_ptz_layout_checked_once(self, ptz_controller, sample_frame):
+        ptz_controller.absolute_move(zoom=0.5)
+        ptz_controller.apply_ptz(sample_frame)
+        assert ptz_controller._layout == (sample_frame.strides, (3,))
+        assert ptz_controller._layout_ok is True
+
+        # Reversed channel order is a strided view that cv2 cannot use as-is
+        rgb_view = sample_frame[:, :, ::-1]
+        result = ptz_controller.apply_ptz(rgb_view).copy()
+        assert ptz_controller._layout_ok is False
+        expected = ptz_controller.apply_ptz(np.ascontiguousarray(rgb_view))
+        np.testing.assert_array_equal(result, expected)
+
+    def test_invalid_resize_quality_rejected(self):
+        with pytest.raises(ValueError):
+            PTZController(resize_quality='bogus')
 
 
 class TestPTZHardwareHandler:
@@ -358,30 +649,24 @@ class TestPTZHardwareHandler:
         result = ptz_controller.remove_hardware_handler(mock_hardware_handler)
         assert result is False
 
-    def test_continuous_move_notifies_handler(self, ptz_controller, mock_hardware_handler):
+    @pytest.mark.parametrize("action,expected_calls", [
+        (lambda c: c.continuous_move(pan_speed=0.5, tilt_speed=-0.3, zoom_speed=0.2),
+         [('on_continuous_move', (0.5, -0.3, 0.2))]),
+        (lambda c: c.stop_movement(),
+         [('on_stop', ())]),
+        (lambda c: c.absolute_move(pan=0.5, tilt=-0.3, zoom=0.2),
+         [('on_absolute_move', (0.5, -0.3, 0.2))]),
+        (lambda c: c.relative_move(pan_delta=0.1, tilt_delta=-0.1, zoom_delta=0.1),
+         [('on_relative_move', (0.1, -0.1, 0.1))]),
+        # goto_home moves absolutely, then reports the home move itself
+        (lambda c: c.goto_home(),
+         [('on_absolute_move', (0.0, 0.0, 0.0)), ('on_goto_home', ())]),
+    ], ids=["continuous_move", "stop", "absolute_move", "relative_move", "goto_home"])
+    def test_action_notifies_handler(self, ptz_controller, mock_hardware_handler,
+                                     action, expected_calls):
         ptz_controller.add_hardware_handler(mock_hardware_handler)
-        ptz_controller.continuous_move(pan_speed=0.5, tilt_speed=-0.3, zoom_speed=0.2)
-        mock_hardware_handler.on_continuous_move.assert_called_once_with(0.5, -0.3, 0.2)
-
-    def test_stop_notifies_handler(self, ptz_controller, mock_hardware_handler):
-        ptz_controller.add_hardware_handler(mock_hardware_handler)
-        ptz_controller.stop_movement()
-        mock_hardware_handler.on_stop.assert_called_once()
-
-    def test_absolute_move_notifies_handler(self, ptz_controller, mock_hardware_handler):
-        ptz_controller.add_hardware_handler(mock_hardware_handler)
-        ptz_controller.absolute_move(pan=0.5, tilt=-0.3, zoom=0.2)
-        mock_hardware_handler.on_absolute_move.assert_called_once_with(0.5, -0.3, 0.2)
-
-    def test_relative_move_notifies_handler(self, ptz_controller, mock_hardware_handler):
-        ptz_controller.add_hardware_handler(mock_hardware_handler)
-        ptz_controller.relative_move(pan_delta=0.1, tilt_delta=-0.1, zoom_delta=0.1)
-        mock_hardware_handler.on_relative_move.assert_called_once_with(0.1, -0.1, 0.1)
-
-    def test_goto_home_notifies_handler(self, ptz_controller, mock_hardware_handler):
-        ptz_controller.add_hardware_handler(mock_hardware_handler)
-        ptz_controller.goto_home()
-        mock_hardware_handler.on_goto_home.assert_called_once()
+        action(ptz_controller)
+        assert mock_hardware_handler.calls == expected_calls
 
     def test_goto_preset_notifies_handler(self, ptz_controller, mock_hardware_handler):
         ptz_controller.add_hardware_handler(mock_hardware_handler)
@@ -389,6 +674,6 @@ class TestPTZHardwareHandler:
         ptz_controller.absolute_move(pan=0.5, tilt=0.3, zoom=0.2)
         ptz_controller.set_preset("test", "Test Preset")
 
-        mock_hardware_handler.reset_mock()
+        mock_hardware_handler.calls.clear()
         ptz_controller.goto_preset("test")
-        mock_hardware_handler.on_goto_preset.assert_called_once()
+        assert [name for name, _ in mock_hardware_handler.calls] == ['on_goto_preset']
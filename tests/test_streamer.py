@@ -7,7 +7,9 @@ tests verify that a blocked/back-pressured pipe can NEVER freeze the caller,
 that overflow is counted as dropped frames, and that stop() joins the writer.
 """
 
+import os
 import subprocess
+import sys
 import threading
 import time
 from unittest.mock import MagicMock, patch
@@ -133,14 +135,39 @@ def test_writer_survives_frame_size_mismatch():
         while time.time() < deadline and not proc.stdin.write.called:
             time.sleep(0.01)
         assert proc.stdin.write.called
-        # 320*240*3 bytes written after resize.
+        # One 320x240 yuv420p frame written after resize.
         written = proc.stdin.write.call_args[0][0]
-        assert len(written) == 320 * 240 * 3
+        assert len(written) == 320 * 240 * 3 // 2
     finally:
         s._is_running = False
         s._stop_writer()
 
 
+@pytest.mark.parametrize("src_w,src_h,expected", [
+    (640, 480, "INTER_AREA"),     # downscale -> box filter
+    (160, 120, "INTER_LINEAR"),   # upscale -> bilinear
+])
+def test_writer_resize_interpolation(monkeypatch, src_w, src_h, expected):
+    import cv2
+    calls = []
+    real_resize = cv2.resize
+
+    def recording_resize(src, dsize, **kwargs):
+        calls.append((dsize, kwargs.get("interpolation")))
+        return real_resize(src, dsize, **kwargs)
+    monkeypatch.setattr("ipycam.streamer.cv2.resize", recording_resize)
+
+    s, proc = _fake_running_streamer()
+    try:
+        s.stream(make_frame(src_w, src_h))
+        deadline = time.time() + 2.0
+        while time.time() < deadline and not proc.stdin.write.called:
+            time.sleep(0.01)
+        assert calls == [((320, 240), getattr(cv2, expected))]
+    finally:
+        s._is_running = False
+        s._stop_writer()
+
 # ---------------------------------------------------------------------------
 # FFmpeg subprocess robustness: stdout disposition, stderr-reader lifecycle,
 # and the writer thread's bounded reconnect after a broken pipe.
@@ -393,14 +420,14 @@ class TestStreamStatsMath:
 
     def test_actual_fps_positive_with_recent_samples(self):
         stats = StreamStats()
-        now = time.time()
+        now = time.monotonic()
         for i in reversed(range(5)):
             stats.record_frame(now - 0.1 * i)
         assert stats.actual_fps > 0
 
     def test_actual_fps_zero_when_samples_outside_window(self):
         stats = StreamStats()
-        old = time.time() - 30
+        old = time.monotonic() - 30
         stats.record_frame(old)
         stats.record_frame(old + 0.1)
         assert stats.actual_fps == 0
@@ -408,11 +435,20 @@ class TestStreamStatsMath:
     def test_actual_fps_zero_when_time_span_is_exactly_zero(self, monkeypatch):
         stats = StreamStats()
         frozen = 1_700_000_000.0
-        monkeypatch.setattr('ipycam.streamer.time.time', lambda: frozen)
+        monkeypatch.setattr('ipycam.streamer.time.monotonic', lambda: frozen)
         stats.record_frame(frozen)
         stats.record_frame(frozen)
         assert stats.actual_fps == 0
 
+    def test_times_ignore_wall_clock_jumps(self, monkeypatch):
+        stats = StreamStats()
+        now = time.monotonic()
+        for i in reversed(range(5)):
+            stats.record_frame(now - 0.1 * i)
+        monkeypatch.setattr('ipycam.streamer.time.time', lambda: 0.0)  # clock reset
+        assert stats.actual_fps > 0
+        assert 0 <= stats.elapsed_time < 60
+
     def test_bitrate_mbps_positive_with_elapsed_time_and_bytes(self):
         stats = StreamStats()
         stats.bytes_sent = 1_000_000
@@ -420,13 +456,18 @@ class TestStreamStatsMath:
 
     def test_bitrate_mbps_zero_when_elapsed_time_not_positive(self):
         stats = StreamStats()
-        stats.start_time = time.time() + 100  # future -> elapsed_time negative
+        stats.start_time = time.monotonic() + 100  # future -> elapsed_time negative
         assert stats.bitrate_mbps == 0
 
     def test_frame_size_and_expected_frame_bytes(self):
         s = VideoStreamer(StreamConfig(width=100, height=50))
         assert s.frame_size == (100, 50)
-        assert s.expected_frame_bytes == 100 * 50 * 3
+        assert s.expected_frame_bytes == 100 * 50 * 3 // 2  # yuv420p
+
+    def test_odd_frame_size_falls_back_to_bgr24(self):
+        s = VideoStreamer(StreamConfig(width=101, height=50))
+        assert s.input_pix_fmt == "bgr24"
+        assert s.expected_frame_bytes == 101 * 50 * 3
 
 
 class TestCheckHwEncoderAvailable:
@@ -479,6 +520,19 @@ class TestStartFfmpegCommandBuilding:
         s._start_ffmpeg(rtmp_url, rtmp_url_sub, hw_type)
         return captured['cmd']
 
+    def test_raw_input_is_yuv420p(self, monkeypatch):
+        s = VideoStreamer(StreamConfig(width=320, height=240, fps=10))
+        cmd = self._captured_cmd(monkeypatch, s, "rtmp://127.0.0.1/test", None, HWAccel.CPU)
+        input_args = cmd[:cmd.index("-i")]
+        assert input_args[input_args.index("-pix_fmt") + 1] == "yuv420p"
+
+    def test_stderr_is_quiet_but_keeps_warnings(self, monkeypatch):
+        s = VideoStreamer(StreamConfig(width=320, height=240, fps=10))
+        cmd = self._captured_cmd(monkeypatch, s, "rtmp://127.0.0.1/test", None, HWAccel.CPU)
+        global_args = cmd[:cmd.index("-i")]
+        assert "-hide_banner" in global_args and "-nostats" in global_args
+        assert global_args[global_args.index("-loglevel") + 1] == "warning"
+
     def test_cpu_uses_libx264_and_expected_encode_args(self, monkeypatch):
         s = VideoStreamer(StreamConfig(width=320, height=240, fps=10))
         cmd = self._captured_cmd(monkeypatch, s, "rtmp://127.0.0.1/test", None, HWAccel.CPU)
@@ -491,6 +545,10 @@ class TestStartFfmpegCommandBuilding:
         assert "h264_nvenc" in cmd
         assert "-gpu" in cmd
         assert "cbr" in cmd
+        assert cmd[cmd.index("-tune") + 1] == "ull"
+        assert cmd[cmd.index("-delay") + 1] == "0"
+        assert cmd[cmd.index("-zerolatency") + 1] == "1"
+        assert cmd.count("-g") == 1  # keyframe interval set once per output
 
     def test_qsv_uses_h264_qsv_and_global_quality(self, monkeypatch):
         s = VideoStreamer(StreamConfig(width=320, height=240, fps=10))
@@ -527,6 +585,121 @@ class TestStartFfmpegCommandBuilding:
         assert "rtmp://127.0.0.1/sub" in cmd
         assert cmd.count("+global_header") == 2  # once per FLV output
 
+    def test_identical_substream_is_encoded_once_and_teed(self, monkeypatch):
+        s = VideoStreamer(StreamConfig(width=320, height=240, fps=10, bitrate="1M",
+                                       sub_width=320, sub_height=240, sub_bitrate="1M"))
+        cmd = self._captured_cmd(
+            monkeypatch, s, "rtmp://127.0.0.1/main", "rtsp://127.0.0.1/sub", HWAccel.NVENC,
+        )
+        assert cmd.count("-c:v") == 1
+        assert "-filter_complex" not in cmd
+        assert cmd[cmd.index("-f", cmd.index("-i")) + 1] == "tee"
+        assert cmd[-1] == "[f=flv]rtmp://127.0.0.1/main|[f=rtsp:rtsp_transport=tcp]rtsp://127.0.0.1/sub"
+
+    def test_substream_with_own_bitrate_keeps_second_encoder(self, monkeypatch):
+        s = VideoStreamer(StreamConfig(width=320, height=240, fps=10, bitrate="1M",
+                                       sub_width=320, sub_height=240, sub_bitrate="500K"))
+        cmd = self._captured_cmd(
+            monkeypatch, s, "rtmp://127.0.0.1/main", "rtmp://127.0.0.1/sub", HWAccel.CPU,
+        )
+        assert cmd.count("-c:v") == 2
+        assert "tee" not in cmd
+
+    def test_nvenc_substream_is_scaled_on_gpu(self, monkeypatch):
+        s = VideoStreamer(StreamConfig(width=320, height=240, fps=10, sub_width=160, sub_height=120))
+        cmd = self._captured_cmd(
+            monkeypatch, s, "rtmp://127.0.0.1/main", "rtmp://127.0.0.1/sub", HWAccel.NVENC,
+        )
+        assert cmd.index("-init_hw_device") < cmd.index("-i")
+        graph = cmd[cmd.index("-filter_complex") + 1]
+        assert graph.startswith("hwupload_cuda,split=2")
+        assert "scale_cuda=160:120" in graph
+        assert cmd.index("[main]") < cmd.index("rtmp://127.0.0.1/main")
+        assert cmd.index("rtmp://127.0.0.1/main") < cmd.index("[subs]")
+        # Frames stay on the GPU: no CPU scale or output pixel format forcing
+        assert "160x120" not in cmd
+        assert cmd.count("-pix_fmt") == 1  # rawvideo input only
+
+    def test_qsv_substream_is_scaled_on_gpu(self, monkeypatch):
+        s = VideoStreamer(StreamConfig(width=320, height=240, fps=10, sub_width=160, sub_height=120))
+        cmd = self._captured_cmd(
+            monkeypatch, s, "rtmp://127.0.0.1/main", "rtmp://127.0.0.1/sub", HWAccel.QSV,
+        )
+        assert cmd[cmd.index("-init_hw_device") + 1] == "qsv=hw"
+        graph = cmd[cmd.index("-filter_complex") + 1]
+        assert "hwupload=extra_hw_frames=16" in graph
+        assert "vpp_qsv=w=160:h=120" in graph
+        assert "160x120" not in cmd
+        assert cmd.count("h264_qsv") == 2
+
+    def test_cpu_substream_has_no_hw_filter_graph(self, monkeypatch):
+        s = VideoStreamer(StreamConfig(width=320, height=240, fps=10, sub_width=160, sub_height=120))
+        cmd = self._captured_cmd(
+            monkeypatch, s, "rtmp://127.0.0.1/main", "rtmp://127.0.0.1/sub", HWAccel.CPU,
+        )
+        assert "-filter_complex" not in cmd and "-init_hw_device" not in cmd
+
+    def test_nvenc_odd_size_substream_keeps_cpu_scale(self, monkeypatch):
+        s = VideoStreamer(StreamConfig(width=321, height=240, fps=10, sub_width=160, sub_height=120))
+        cmd = self._captured_cmd(
+            monkeypatch, s, "rtmp://127.0.0.1/main", "rtmp://127.0.0.1/sub", HWAccel.NVENC,
+        )
+        assert "-filter_complex" not in cmd
+        assert "160x120" in cmd
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="F_SETPIPE_SZ is Linux-only")
+def test_grow_stdin_pipe_enlarges_pipe_buffer():
+    import fcntl
+    r, w = os.pipe()
+    try:
+        s = VideoStreamer(StreamConfig(width=4, height=4))
+        s._ffmpeg_process = MagicMock()
+        s._ffmpeg_process.stdin.fileno.return_value = w
+        s._grow_stdin_pipe()
+        f_getpipe_sz = getattr(fcntl, "F_GETPIPE_SZ", 1032)
+        assert fcntl.fcntl(w, f_getpipe_sz) == 1 << 20
+    finally:
+        os.close(r)
+        os.close(w)
+
+
+def test_grow_stdin_pipe_failure_is_ignored():
+    s = VideoStreamer(StreamConfig(width=4, height=4))
+    s._ffmpeg_process = MagicMock()
+    s._ffmpeg_process.stdin.fileno.side_effect = OSError("closed")
+    s._grow_stdin_pipe()  # must not raise
+
+class TestFfmpegScheduling:
+    def _streamer(self, monkeypatch, **config):
+        calls = []
+        monkeypatch.setattr("ipycam.streamer.os.sched_setaffinity",
+                            lambda pid, cpus: calls.append(("affinity", pid, cpus)), raising=False)
+        monkeypatch.setattr("ipycam.streamer.os.setpriority",
+                            lambda which, pid, nice: calls.append(("nice", pid, nice)), raising=False)
+        s = VideoStreamer(StreamConfig(width=4, height=4, **config))
+        s._ffmpeg_process = MagicMock(pid=4321)
+        return s, calls
+
+    def test_default_leaves_scheduling_alone(self, monkeypatch):
+        s, calls = self._streamer(monkeypatch)
+        s._apply_ffmpeg_scheduling()
+        assert calls == []
+
+    def test_configured_affinity_and_niceness_applied_to_ffmpeg_pid(self, monkeypatch):
+        s, calls = self._streamer(monkeypatch, ffmpeg_cpus=(2, 3), ffmpeg_nice=-5)
+        s._apply_ffmpeg_scheduling()
+        assert calls == [("affinity", 4321, (2, 3)), ("nice", 4321, -5)]
+
+    def test_permission_error_is_logged_not_raised(self, monkeypatch, caplog):
+        s, _ = self._streamer(monkeypatch, ffmpeg_nice=-5)
+
+        def denied(which, pid, nice):
+            raise PermissionError("not permitted")
+        monkeypatch.setattr("ipycam.streamer.os.setpriority", denied, raising=False)
+        with caplog.at_level("WARNING"):
+            s._apply_ffmpeg_scheduling()
+        assert "niceness" in caplog.text
 
 class TestWarmUpEncoder:
     def test_success_sends_three_frames(self):
@@ -646,27 +819,17 @@ class TestDumpFfmpegError:
             s._dump_ffmpeg_error()
         assert not any("FFmpeg error output" in r.message for r in caplog.records)
 
-    def test_dump_without_buffer_reads_process_stderr_directly(self, caplog):
-        s = VideoStreamer(StreamConfig(width=4, height=4))
-        s._ffmpeg_stderr_buffer = []
-        proc = MagicMock()
-        proc.stderr = MagicMock()
-        proc.stderr.read.return_value = b"late stderr output"
-        s._ffmpeg_process = proc
-        with caplog.at_level("ERROR"):
-            s._dump_ffmpeg_error()
-        assert any("late stderr output" in r.message for r in caplog.records)
-
-    def test_dump_stderr_read_exception_is_logged(self, caplog):
+    def test_dump_without_buffer_never_reads_process_stderr(self, caplog):
+        """The reader thread owns the pipe; a direct read() here would block
+        until a still-running FFmpeg exits."""
         s = VideoStreamer(StreamConfig(width=4, height=4))
-        s._ffmpeg_stderr_buffer = []
         proc = MagicMock()
         proc.stderr = MagicMock()
-        proc.stderr.read.side_effect = OSError("closed")
         s._ffmpeg_process = proc
         with caplog.at_level("ERROR"):
             s._dump_ffmpeg_error()
-        assert any("Could not read FFmpeg stderr" in r.message for r in caplog.records)
+        proc.stderr.read.assert_not_called()
+        assert not any("FFmpeg error output" in r.message for r in caplog.records)
 
 
 class TestCleanupFfmpeg:
@@ -902,7 +1065,7 @@ class TestWriteLoopFormatConversion:
                 time.sleep(0.01)
             assert proc.stdin.write.called
             written = proc.stdin.write.call_args[0][0]
-            assert len(written) == 320 * 240 * 3  # converted to 3-channel BGR
+            assert len(written) == 320 * 240 * 3 // 2  # converted via BGR to yuv420p
         finally:
             s._is_running = False
             s._stop_writer()
@@ -910,14 +1073,61 @@ class TestWriteLoopFormatConversion:
     def test_bgra_frame_is_trimmed_to_bgr(self):
         s, proc = _fake_running_streamer()
         try:
-            bgra = np.zeros((240, 320, 4), dtype=np.uint8)  # 4-channel BGRA
+            bgra = np.full((240, 320, 4), 255, dtype=np.uint8)  # 4-channel BGRA
+            bgra[:, :, 3] = 0  # alpha must not leak into the colour planes
             s.stream(bgra)
             deadline = time.time() + 2.0
             while time.time() < deadline and not proc.stdin.write.called:
                 time.sleep(0.01)
             assert proc.stdin.write.called
             written = proc.stdin.write.call_args[0][0]
-            assert len(written) == 320 * 240 * 3  # alpha channel dropped
+            assert len(written) == 320 * 240 * 3 // 2  # alpha channel dropped
+            assert set(written[:320 * 240]) == {235}
+        finally:
+            s._is_running = False
+            s._stop_writer()
+
+    def test_frame_is_written_as_i420(self):
+        s, proc = _fake_running_streamer()
+        try:
+            s.stream(np.full((240, 320, 3), 255, dtype=np.uint8))
+            deadline = time.time() + 2.0
+            while time.time() < deadline and not proc.stdin.write.called:
+                time.sleep(0.01)
+            written = proc.stdin.write.call_args[0][0]
+            y_size = 320 * 240
+            # Limited-range BT.601 white: Y=235, neutral chroma
+            assert set(written[:y_size]) == {235}
+            assert set(written[y_size:]) == {128}
+        finally:
+            s._is_running = False
+            s._stop_writer()
+
+    def test_stdin_flushed_on_first_frame_then_every_interval(self):
+        s, proc = _fake_running_streamer()
+        s.FLUSH_INTERVAL = 3
+        try:
+            for sent in range(1, 8):
+                s.stream(make_frame(320, 240))
+                deadline = time.time() + 2.0
+                while time.time() < deadline and s.stats.frames_sent < sent:
+                    time.sleep(0.01)
+            assert proc.stdin.write.call_count == 7
+            assert proc.stdin.flush.call_count == 3  # frames 1, 4 and 7
+        finally:
+            s._is_running = False
+            s._stop_writer()
+
+    def test_yuv_scratch_buffer_is_reused_across_frames(self):
+        s, proc = _fake_running_streamer()
+        try:
+            for sent, value in enumerate((0, 255), start=1):
+                s.stream(np.full((240, 320, 3), value, dtype=np.uint8))
+                deadline = time.time() + 2.0
+                while time.time() < deadline and s.stats.frames_sent < sent:
+                    time.sleep(0.01)
+            first, second = (c[0][0] for c in proc.stdin.write.call_args_list[:2])
+            assert first.obj is second.obj  # same underlying buffer
         finally:
             s._is_running = False
             s._stop_writer()
@@ -1005,6 +1215,7 @@ class TestStderrReaderThread:
 
         assert not thread.is_alive()
         assert len(s._ffmpeg_stderr_buffer) == 100  # trimmed to the 100-line cap
+        assert s._ffmpeg_stderr_buffer[0] == b"line5\n"  # oldest lines dropped
 
     def test_reader_exception_is_swallowed_and_thread_exits(self, monkeypatch):
         s = VideoStreamer(StreamConfig(width=4, height=4, fps=10))